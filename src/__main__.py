@@ -0,0 +1,128 @@
+import argparse
+import importlib
+import os
+import sys
+
+
+COMMANDS = {
+    "fetch-game-ids": ("src.ingest.fetch_game_ids", "Fetch scoreboard game IDs"),
+    "fetch-recaps": ("src.ingest.fetch_game_recaps", "Scrape ESPN recap text"),
+    "fetch-boxscores": ("src.ingest.fetch_boxscores", "Scrape ESPN boxscore cards"),
+    "extract-facts": ("src.process.extract_facts", "Extract facts from recaps"),
+    "sync-preferences": ("src.process.sync_preferences", "Sync subscriber preferences"),
+    "generate-takes": ("src.process.generate_takes", "Generate LLM takes"),
+    "personalize": ("src.process.personalize", "Match takes to subscribers"),
+    "send-emails": ("src.delivery.send_emails", "Send deliveries via SendGrid"),
+    "bench-startup": ("src.bench.startup", "Report import time of every command"),
+    "bench-aliases": ("src.bench.alias_matcher", "Benchmark team-alias matching"),
+    "bench-extract": ("src.bench.extract_facts", "Benchmark parallel fact extraction"),
+    "bench-supabase": ("src.bench.supabase_pages", "Benchmark paged Supabase reads"),
+    "bench-store": ("src.bench.store_queries", "Check and time pipeline store team lookups"),
+}
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--run-id", help="Override RUN_ID for this invocation")
+    common.add_argument("--run-date", help="Override RUN_DATE (YYYY-MM-DD)")
+    common.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Set an environment variable before the command runs",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Sports Takes Newsletter pipeline.",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text, parents=[common])
+
+    web_parser = subparsers.add_parser(
+        "web", help="Run the signup web app", parents=[common]
+    )
+    web_parser.add_argument("--port", type=int, default=5000)
+    web_parser.add_argument("--debug", action="store_true")
+
+    query_parser = subparsers.add_parser(
+        "query", help="Query the pipeline store", parents=[common]
+    )
+    query_parser.add_argument("table", choices=["games", "facts", "takes", "deliveries"])
+    query_parser.add_argument("--db", help="SQLite path (default: PIPELINE_DB_PATH)")
+    query_parser.add_argument("--team")
+    query_parser.add_argument("--style")
+    query_parser.add_argument("--game-id")
+    query_parser.add_argument("--user-id")
+    query_parser.add_argument("--query-run-id", dest="query_run_id")
+    query_parser.add_argument("--since", help="Minimum game_date (inclusive)")
+    query_parser.add_argument("--until", help="Maximum game_date (exclusive)")
+    query_parser.add_argument("--limit", type=int, default=50)
+    return parser
+
+
+def apply_env(args):
+    if args.run_id:
+        os.environ["RUN_ID"] = args.run_id
+    if args.run_date:
+        os.environ["RUN_DATE"] = args.run_date
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise SystemExit(f"Invalid --env value (expected KEY=VALUE): {item}")
+        os.environ[key] = value
+
+
+def run_web(args):
+    from web.app import app
+
+    print("[INFO] Starting Sports Takes Web App")
+    app.run(debug=args.debug, port=args.port)
+
+
+def run_query(args):
+    import json
+
+    from src.pipeline.common import get_env
+    from src.pipeline import store
+
+    db_path = args.db or get_env("PIPELINE_DB_PATH", required=True)
+    conn = store.open_store(db_path)
+    filters = {"run_id": args.query_run_id, "limit": args.limit}
+    if args.table == "deliveries":
+        rows = store.query_deliveries(conn, user_id=args.user_id, **filters)
+    else:
+        filters.update(
+            game_id=args.game_id,
+            team=args.team,
+            date_from=args.since,
+            date_to=args.until,
+        )
+        if args.table == "takes":
+            rows = store.query_takes(conn, style=args.style, **filters)
+        elif args.table == "facts":
+            rows = store.query_facts(conn, **filters)
+        else:
+            rows = store.query_games(conn, **filters)
+    conn.close()
+    json.dump(rows, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    apply_env(args)
+    if args.command == "web":
+        return run_web(args)
+    if args.command == "query":
+        return run_query(args)
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    return module.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
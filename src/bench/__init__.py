@@ -0,0 +1 @@
+"""Benchmark scripts for pipeline hot paths."""
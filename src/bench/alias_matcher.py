@@ -0,0 +1,159 @@
+import random
+import time
+
+from src.pipeline.common import get_env, load_json, log_info
+from src.pipeline.team_utils import build_game_aliases
+from src.process.extract_facts import (
+    build_alias_groups,
+    compile_alias_matcher,
+    sentence_matches,
+    sentence_mentions_team,
+    split_sentences,
+)
+
+
+TEAMS = [
+    ("Atlanta Hawks", "Hawks", "ATL"),
+    ("Boston Celtics", "Celtics", "BOS"),
+    ("Brooklyn Nets", "Nets", "BKN"),
+    ("Charlotte Hornets", "Hornets", "CHA"),
+    ("Chicago Bulls", "Bulls", "CHI"),
+    ("Cleveland Cavaliers", "Cavaliers", "CLE"),
+    ("Dallas Mavericks", "Mavericks", "DAL"),
+    ("Denver Nuggets", "Nuggets", "DEN"),
+    ("Detroit Pistons", "Pistons", "DET"),
+    ("Golden State Warriors", "Warriors", "GS"),
+    ("Houston Rockets", "Rockets", "HOU"),
+    ("Indiana Pacers", "Pacers", "IND"),
+    ("LA Clippers", "Clippers", "LAC"),
+    ("Los Angeles Lakers", "Lakers", "LAL"),
+    ("Memphis Grizzlies", "Grizzlies", "MEM"),
+    ("Miami Heat", "Heat", "MIA"),
+    ("Milwaukee Bucks", "Bucks", "MIL"),
+    ("Minnesota Timberwolves", "Timberwolves", "MIN"),
+    ("New Orleans Pelicans", "Pelicans", "NO"),
+    ("New York Knicks", "Knicks", "NY"),
+    ("Oklahoma City Thunder", "Thunder", "OKC"),
+    ("Orlando Magic", "Magic", "ORL"),
+    ("Philadelphia 76ers", "76ers", "PHI"),
+    ("Phoenix Suns", "Suns", "PHX"),
+    ("Portland Trail Blazers", "Trail Blazers", "POR"),
+    ("Sacramento Kings", "Kings", "SAC"),
+    ("San Antonio Spurs", "Spurs", "SA"),
+    ("Toronto Raptors", "Raptors", "TOR"),
+    ("Utah Jazz", "Jazz", "UTAH"),
+    ("Washington Wizards", "Wizards", "WSH"),
+]
+
+FILLER = [
+    "The lead changed hands {n} times before halftime.",
+    "{player} scored {n} points and added {m} rebounds for the {team}.",
+    "It was the {team}' {n}th win in their last {m} games.",
+    "{player} hit a 3-pointer with {n} seconds left.",
+    "Coach {player} said afterward that the defense made the difference.",
+    "The crowd of {n},{m}00 was on its feet late in the fourth quarter.",
+    "{abbr} shot {n} percent from the field in the second half.",
+]
+PLAYERS = ["Jalen Brunson", "Jayson Tatum", "Nikola Jokic", "Luka Doncic", "Anthony Edwards"]
+
+
+def _team_dict(team):
+    name, short_name, abbreviation = team
+    return {"name": name, "short_name": short_name, "abbreviation": abbreviation}
+
+
+def build_synthetic_corpus(games, paragraphs, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(games):
+        home, away = rng.sample(TEAMS, 2)
+        home_team, away_team = _team_dict(home), _team_dict(away)
+        recap_text = []
+        for _ in range(paragraphs):
+            sentences = []
+            for _ in range(rng.randint(1, 3)):
+                team = rng.choice([home, away, rng.choice(TEAMS)])
+                template = rng.choice(FILLER)
+                sentences.append(
+                    template.format(
+                        n=rng.randint(2, 60),
+                        m=rng.randint(2, 15),
+                        player=rng.choice(PLAYERS),
+                        team=rng.choice(team[:2]),
+                        abbr=team[2],
+                    )
+                )
+            recap_text.append(" ".join(sentences))
+        corpus.append(
+            {
+                "game_id": str(index),
+                "home_team": home_team,
+                "away_team": away_team,
+                "team_aliases": build_game_aliases(home_team, away_team),
+                "recap_text": recap_text,
+            }
+        )
+    return corpus
+
+
+def presplit(corpus):
+    for recap in corpus:
+        recap["sentences"] = [
+            sentence
+            for paragraph in recap.get("recap_text") or []
+            for sentence in split_sentences(paragraph)
+        ]
+    return corpus
+
+
+def run_legacy(corpus):
+    results = []
+    for recap in corpus:
+        alias_values = [alias.lower() for alias in recap.get("team_aliases") or [] if alias]
+        for sentence in recap["sentences"]:
+            results.append(sentence_mentions_team(sentence, alias_values))
+    return results
+
+
+def run_compiled(corpus):
+    results = []
+    for recap in corpus:
+        matcher = compile_alias_matcher(build_alias_groups(recap))
+        for sentence in recap["sentences"]:
+            results.append(sentence_matches(matcher, sentence))
+    return results
+
+
+def main():
+    recaps_path = get_env("RECAPS_PATH", default="")
+    if recaps_path:
+        corpus = load_json(recaps_path).get("games", [])
+        log_info(f"Loaded {len(corpus)} recaps from {recaps_path}")
+    else:
+        games = int(get_env("BENCH_GAMES", default="1230"))
+        paragraphs = int(get_env("BENCH_PARAGRAPHS", default="20"))
+        corpus = build_synthetic_corpus(games, paragraphs, seed=2026)
+        log_info(f"Built synthetic corpus: games={games} paragraphs_per_game={paragraphs}")
+
+    presplit(corpus)
+    timings = {}
+    outputs = {}
+    for label, runner in (("legacy", run_legacy), ("compiled", run_compiled)):
+        started = time.perf_counter()
+        outputs[label] = runner(corpus)
+        timings[label] = time.perf_counter() - started
+
+    if outputs["legacy"] != outputs["compiled"]:
+        raise RuntimeError("Compiled alias matcher disagrees with legacy matching.")
+
+    sentences = len(outputs["legacy"])
+    for label, elapsed in timings.items():
+        log_info(
+            f"{label}: {elapsed * 1000:.1f}ms "
+            f"({sentences / elapsed:,.0f} sentences/s, matched={sum(outputs[label])})"
+        )
+    log_info(f"Speedup: {timings['legacy'] / timings['compiled']:.2f}x over {sentences} sentences")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import os
+import time
+
+from src.bench.alias_matcher import build_synthetic_corpus
+from src.pipeline.common import get_env, log_info
+from src.process.extract_facts import iter_extracted
+
+
+def main():
+    games = int(get_env("BENCH_GAMES", default="5000"))
+    paragraphs = int(get_env("BENCH_PARAGRAPHS", default="25"))
+    chunk_size = int(get_env("EXTRACT_CHUNK_SIZE", default="64"))
+    max_workers = int(get_env("BENCH_MAX_WORKERS", default=str(os.cpu_count() or 1)))
+
+    corpus = build_synthetic_corpus(games, paragraphs, seed=2026)
+    log_info(f"Built synthetic corpus: games={games} paragraphs_per_game={paragraphs}")
+
+    baseline = None
+    reference = None
+    workers = 1
+    while workers <= max_workers:
+        started = time.perf_counter()
+        results = list(iter_extracted(corpus, 3, 300, workers, chunk_size))
+        elapsed = time.perf_counter() - started
+        if reference is None:
+            reference = results
+            baseline = elapsed
+        elif results != reference:
+            raise RuntimeError(f"Output with workers={workers} differs from sequential run.")
+        log_info(
+            f"workers={workers}: {elapsed:.2f}s ({games / elapsed:,.0f} games/s, "
+            f"speedup={baseline / elapsed:.2f}x)"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
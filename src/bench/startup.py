@@ -0,0 +1,98 @@
+import subprocess
+import sys
+import time
+
+from src.pipeline.common import get_env, log_info, log_warning
+
+
+TARGETS = [
+    ("cli", "src.__main__"),
+    ("fetch-game-ids", "src.ingest.fetch_game_ids"),
+    ("fetch-recaps", "src.ingest.fetch_game_recaps"),
+    ("fetch-boxscores", "src.ingest.fetch_boxscores"),
+    ("extract-facts", "src.process.extract_facts"),
+    ("generate-takes", "src.process.generate_takes"),
+    ("personalize", "src.process.personalize"),
+    ("send-emails", "src.delivery.send_emails"),
+    ("web", "web.app"),
+]
+
+
+def parse_importtime(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append(
+            {
+                "module": name.strip(),
+                "self_us": self_us,
+                "cumulative_us": cumulative_us,
+                "depth": depth,
+            }
+        )
+    return entries
+
+
+def measure_import(module_name):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    entries = parse_importtime(result.stderr)
+    top_level = [entry for entry in entries if entry["depth"] == 0]
+    total_us = sum(entry["cumulative_us"] for entry in top_level)
+    heaviest = sorted(
+        (entry for entry in entries if entry["depth"] == 1),
+        key=lambda entry: entry["cumulative_us"],
+        reverse=True,
+    )
+    return {
+        "ok": result.returncode == 0,
+        "wall_ms": wall_ms,
+        "import_ms": total_us / 1000,
+        "heaviest": heaviest,
+        "error": result.stderr.strip().splitlines()[-1] if result.returncode else "",
+    }
+
+
+def main():
+    top_n = int(get_env("STARTUP_BENCH_TOP", default="5"))
+    budget_ms = float(get_env("STARTUP_BUDGET_MS", default="0"))
+
+    over_budget = []
+    for label, module_name in TARGETS:
+        report = measure_import(module_name)
+        if not report["ok"]:
+            log_warning(f"{label}: import failed ({report['error']})")
+            continue
+        log_info(
+            f"{label}: import={report['import_ms']:.1f}ms "
+            f"process={report['wall_ms']:.1f}ms module={module_name}"
+        )
+        for entry in report["heaviest"][:top_n]:
+            log_info(f"    {entry['cumulative_us'] / 1000:8.1f}ms  {entry['module']}")
+        if budget_ms and report["import_ms"] > budget_ms:
+            over_budget.append(label)
+
+    if over_budget:
+        raise RuntimeError(
+            f"Import time over {budget_ms:.0f}ms budget: {', '.join(over_budget)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import datetime
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.bench.alias_matcher import TEAMS
+from src.pipeline.common import get_env, log_info
+from src.pipeline.store import open_store, query_takes, write_takes
+from src.pipeline.team_utils import build_game_aliases
+
+STYLES = ["factual", "hot_takes", "analytical", "nuanced", "mix"]
+SEASON_START = datetime.date(2025, 10, 21)
+
+
+def _team_dict(team):
+    name, short_name, abbreviation = team
+    return {"name": name, "short_name": short_name, "abbreviation": abbreviation}
+
+
+def build_synthetic_takes(games, seed):
+    # Shaped like generate-takes output: no home/away records, only the flat
+    # `teams` and `team_aliases` lists that the generate and personalize
+    # databases see.
+    rng = random.Random(seed)
+    takes = []
+    for index in range(games):
+        home, away = rng.sample(TEAMS, 2)
+        game_date = (SEASON_START + datetime.timedelta(days=index * 170 // games)).isoformat()
+        for focus in (home, away):
+            for style in STYLES:
+                takes.append(
+                    {
+                        "game_id": str(index),
+                        "game_date": game_date,
+                        "teams": [home[0], away[0]],
+                        "team_aliases": build_game_aliases(_team_dict(home), _team_dict(away)),
+                        "focus_team": focus[0],
+                        "style": style,
+                        "take_text": f"{style} take on {focus[1]}.",
+                    }
+                )
+    return takes
+
+
+def take_ids(takes):
+    return sorted((take["game_id"], take["focus_team"], take["style"]) for take in takes)
+
+
+def main():
+    games = int(get_env("BENCH_GAMES", default="1230"))
+    lookups = int(get_env("BENCH_LOOKUPS", default="200"))
+    takes = build_synthetic_takes(games, seed=2026)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = open_store(Path(tmp_dir) / "pipeline.db")
+        started = time.perf_counter()
+        write_takes(store, "bench", takes)
+        log_info(f"Wrote {len(takes)} takes for {games} games in {time.perf_counter() - started:.2f}s")
+
+        # The README example, by nickname, abbreviation and full name.
+        date_from = (SEASON_START + datetime.timedelta(days=90)).isoformat()
+        expected = take_ids(
+            take
+            for take in takes
+            if take["focus_team"] == "New York Knicks" and take["game_date"] >= date_from
+        )
+        for team in ("Knicks", "NY", "New York Knicks"):
+            found = take_ids(query_takes(store, team=team, date_from=date_from))
+            if found != expected:
+                raise RuntimeError(
+                    f"query_takes(team={team!r}) returned {len(found)} takes, "
+                    f"expected {len(expected)}"
+                )
+        log_info(f"query_takes(team='Knicks', date_from={date_from}) -> {len(expected)} takes")
+
+        rng = random.Random(7)
+        started = time.perf_counter()
+        for _ in range(lookups):
+            team = rng.choice(TEAMS)
+            query_takes(store, team=rng.choice(team), style=rng.choice(STYLES), date_from=date_from)
+        elapsed = time.perf_counter() - started
+        log_info(
+            f"{lookups} alias lookups in {elapsed * 1000:.1f}ms "
+            f"({elapsed * 1000 / lookups:.2f}ms each)"
+        )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from src.bench.alias_matcher import TEAMS
+from src.pipeline.common import get_env, log_info
+from src.pipeline.http_utils import request_with_retry
+from src.pipeline.supabase_utils import SupabaseReader
+
+
+RANGE_RE = re.compile(r"^(\d+)-(\d+)$")
+
+
+def synthetic_row(index):
+    return {"id": index + 1, "user_id": str(index // 3), "team": TEAMS[index % len(TEAMS)][0]}
+
+
+def build_stand_in(total_rows, max_rows, latency_seconds):
+    # Enough of PostgREST for the reader: Range/Content-Range, Prefer:
+    # count=exact, limit/offset, `id=gt.N` keyset filters and a max-rows cap
+    # that truncates responses without an error.
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency_seconds)
+            params = parse_qs(urlsplit(self.path).query)
+            start = 0
+            id_filter = params.get("id", [""])[0]
+            if id_filter.startswith("gt."):
+                start = int(id_filter[len("gt."):])
+            offset = int(params.get("offset", ["0"])[0])
+            limit = int(params["limit"][0]) if "limit" in params else None
+            range_match = RANGE_RE.match(self.headers.get("Range", ""))
+            if range_match:
+                offset = int(range_match.group(1))
+                limit = int(range_match.group(2)) - offset + 1
+            counted = "count=exact" in (self.headers.get("Prefer") or "")
+            total_label = str(total_rows) if counted else "*"
+
+            first = start + offset
+            if range_match and first >= total_rows and total_rows:
+                self._send(416, b"[]", f"*/{total_rows}")
+                return
+            count = min(limit if limit is not None else max_rows, max_rows)
+            count = max(0, min(count, total_rows - first))
+            body = json.dumps([synthetic_row(index) for index in range(first, first + count)])
+            content_range = f"{first}-{first + count - 1}/{total_label}" if count else f"*/{total_label}"
+            partial = range_match is not None and count < total_rows
+            self._send(206 if partial else 200, body.encode("utf-8"), content_range)
+
+        def _send(self, status, body, content_range):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Range", content_range)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def read_all(reader, total_rows):
+    started = time.perf_counter()
+    expected_id = 1
+    for row in reader.iter_rows("interests", "select=id,user_id,team"):
+        if row["id"] != expected_id:
+            raise RuntimeError(f"Expected id={expected_id}, got id={row['id']}")
+        expected_id += 1
+    elapsed = time.perf_counter() - started
+    rows = expected_id - 1
+    if rows != total_rows:
+        raise RuntimeError(f"Read {rows} of {total_rows} rows")
+    return elapsed, reader.stats["interests"]["pages"]
+
+
+def main():
+    total_rows = int(get_env("BENCH_ROWS", default="1000000"))
+    max_rows = int(get_env("BENCH_MAX_ROWS", default="1000"))
+    latency_ms = float(get_env("BENCH_LATENCY_MS", default="10"))
+    max_concurrency = int(get_env("BENCH_MAX_CONCURRENCY", default="8"))
+
+    server = build_stand_in(total_rows, max_rows, latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    log_info(
+        f"PostgREST stand-in at {base_url}: rows={total_rows} max_rows={max_rows} "
+        f"latency={latency_ms:g}ms"
+    )
+
+    # What a single unpaged GET used to see: a capped response and no error.
+    response = request_with_retry("GET", f"{base_url}/rest/v1/interests?select=id", timeout=60)
+    log_info(f"unpaged GET: {len(response.json())} of {total_rows} rows (status={response.status_code})")
+
+    baseline = None
+    concurrency = 1
+    while concurrency <= max_concurrency:
+        reader = SupabaseReader(base_url, "bench", page_size=max_rows, concurrency=concurrency)
+        elapsed, pages = read_all(reader, total_rows)
+        baseline = baseline or elapsed
+        log_info(
+            f"range concurrency={concurrency}: {elapsed:.2f}s pages={pages} "
+            f"({total_rows / elapsed:,.0f} rows/s, speedup={baseline / elapsed:.2f}x)"
+        )
+        concurrency *= 2
+
+    # Asking for more than max-rows must still read every row.
+    reader = SupabaseReader(base_url, "bench", page_size=max_rows * 5, concurrency=max_concurrency)
+    elapsed, pages = read_all(reader, total_rows)
+    log_info(f"range page_size={max_rows * 5} (capped): {elapsed:.2f}s pages={pages}")
+
+    reader = SupabaseReader(base_url, "bench", page_size=max_rows, paging="keyset")
+    elapsed, pages = read_all(reader, total_rows)
+    log_info(
+        f"keyset: {elapsed:.2f}s pages={pages} ({total_rows / elapsed:,.0f} rows/s, "
+        f"speedup={baseline / elapsed:.2f}x)"
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import html
 import re
-import requests
 
 from src.pipeline.common import (
     build_run_id,
@@ -13,6 +12,7 @@ from src.pipeline.common import (
     log_warning,
     resolve_run_date,
 )
+from src.pipeline.http_utils import log_http_stats, request_with_retry
 
 
 SENDGRID_API_URL = "https://api.sendgrid.com/v3/mail/send"
@@ -145,8 +145,8 @@ def send_email(
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
-    response = requests.post(
-        SENDGRID_API_URL, headers=headers, json=payload, timeout=20
+    response = request_with_retry(
+        "POST", SENDGRID_API_URL, headers=headers, json=payload, timeout=20
     )
     return response
 
@@ -237,6 +237,7 @@ def main():
         else:
             failed_count += 1
 
+    log_http_stats()
     log_end(
         "send_emails",
         f"deliveries={len(deliveries)} sent={sent_count} failed={failed_count}",
@@ -1,5 +1,7 @@
+import json
 import time
 from datetime import datetime, timezone
+from pathlib import Path
 
 from bs4 import BeautifulSoup
 
@@ -15,7 +17,7 @@ from src.pipeline.common import (
     resolve_run_date,
     write_json,
 )
-from src.pipeline.http_utils import request_with_retry
+from src.pipeline.http_utils import log_http_stats, request_with_retry
 
 
 BOX_SCORE_URL = "https://www.espn.com/nba/boxscore/_/gameId/"
@@ -113,7 +115,15 @@ def main():
         if delay_seconds > 0:
             time.sleep(delay_seconds)
 
-    write_json(output_path, results)
+    if str(output_path).endswith(".jsonl"):
+        # One game per line, which extract-facts indexes instead of loading.
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as file_handle:
+            for game_id, entry in results.items():
+                file_handle.write(json.dumps(dict(entry, game_id=game_id)) + "\n")
+    else:
+        write_json(output_path, results)
+    log_http_stats()
     log_end(
         "fetch_boxscores",
         f"boxscores={len(results)} output={output_path}",
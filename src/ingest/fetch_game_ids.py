@@ -12,7 +12,8 @@ from src.pipeline.common import (
     resolve_run_date,
     write_json,
 )
-from src.pipeline.http_utils import request_with_retry
+from src.pipeline.http_utils import log_http_stats, request_with_retry
+from src.pipeline.store import open_store_from_env, write_games
 from src.pipeline.team_utils import build_game_aliases
 
 
@@ -153,6 +154,12 @@ def main():
     }
     write_json(output_path, output_payload)
 
+    store = open_store_from_env()
+    if store is not None:
+        write_games(store, run_id, games)
+        store.close()
+
+    log_http_stats()
     log_end(
         "fetch_game_ids",
         f"games={len(games)} errors={len(errors)} output={output_path}",
@@ -15,7 +15,7 @@ from src.pipeline.common import (
     resolve_run_date,
     write_json,
 )
-from src.pipeline.http_utils import request_with_retry
+from src.pipeline.http_utils import log_http_stats, request_with_retry
 
 
 USER_AGENT = (
@@ -113,6 +113,8 @@ def main():
                         "game_date": game.get("game_date"),
                         "teams": game.get("teams", []),
                         "team_aliases": game.get("team_aliases", []),
+                        "home_team": game.get("home_team"),
+                        "away_team": game.get("away_team"),
                         "recap_text": recap_text,
                         "source_url": recap_url,
                     }
@@ -138,6 +140,7 @@ def main():
     }
     write_json(output_path, output_payload)
 
+    log_http_stats()
     log_end(
         "fetch_game_recaps",
         f"recaps={len(recap_games)} errors={len(errors)} output={output_path}",
@@ -0,0 +1,224 @@
+import re
+
+from .team_utils import matches_team
+
+
+SECTION_LABELS = {"starters", "bench", "team"}
+MADE_ATTEMPTED_RE = re.compile(r"^(\d+)-(\d+)$")
+
+
+def _cell_text(cell):
+    long_name = cell.select_one(".Boxscore__AthleteName--long")
+    if long_name is not None:
+        return long_name.get_text(" ", strip=True)
+    return cell.get_text(" ", strip=True)
+
+
+def _table_rows(table):
+    return [
+        [_cell_text(cell) for cell in row.find_all(["td", "th"])]
+        for row in table.find_all("tr")
+    ]
+
+
+def _card_team_name(card):
+    for selector in (
+        ".BoxscoreItem__TeamName",
+        ".Boxscore__Title",
+        ".Card__Header__Title",
+        "h2",
+        "h3",
+    ):
+        element = card.select_one(selector)
+        if element is not None:
+            text = element.get_text(" ", strip=True)
+            if text:
+                return text
+    return ""
+
+
+def _merge_tables(tables):
+    # ESPN renders a fixed name column and a scrolling stats table side by
+    # side; stitch them back together row by row.
+    if len(tables) >= 2:
+        left_rows = _table_rows(tables[0])
+        right_rows = _table_rows(tables[1])
+        if len(left_rows) == len(right_rows):
+            return [
+                (left[0] if left else "", right)
+                for left, right in zip(left_rows, right_rows)
+            ]
+    rows = []
+    for table in tables:
+        for cells in _table_rows(table):
+            if cells:
+                rows.append((cells[0], cells[1:]))
+    return rows
+
+
+def _parse_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_boxscore_card(card):
+    tables = card.find_all("table")
+    if not tables:
+        return None
+
+    team = {"team": _card_team_name(card), "players": [], "totals": {}}
+    header = []
+    section = "starters"
+    expect_percentages = False
+    for label, cells in _merge_tables(tables):
+        label_lower = label.strip().lower()
+        if "PTS" in cells or "MIN" in cells:
+            header = cells
+            if label_lower in SECTION_LABELS:
+                section = label_lower
+            continue
+        if label_lower in SECTION_LABELS:
+            section = label_lower
+            if label_lower == "team" and header:
+                team["totals"] = dict(zip(header, cells))
+                expect_percentages = True
+            continue
+        if expect_percentages:
+            team["percentages"] = dict(zip(header, cells))
+            expect_percentages = False
+            continue
+        if not header or not label or not cells:
+            continue
+        stats = dict(zip(header, cells))
+        if _parse_number(stats.get("PTS")) is None:
+            continue
+        team["players"].append(
+            {"name": label, "starter": section == "starters", "stats": stats}
+        )
+    if not team["players"]:
+        return None
+    return team
+
+
+def parse_boxscore_html(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    cards = soup.select("div.Card") or [soup]
+    teams = []
+    for card in cards:
+        parsed = parse_boxscore_card(card)
+        if parsed:
+            teams.append(parsed)
+    return teams
+
+
+def _stat(player, key):
+    return _parse_number(player["stats"].get(key)) or 0
+
+
+def _shooting_line(totals, key, label):
+    match = MADE_ATTEMPTED_RE.match((totals.get(key) or "").strip())
+    if not match:
+        return None
+    made, attempted = int(match.group(1)), int(match.group(2))
+    if not attempted:
+        return None
+    return f"{made}-{attempted} {label} ({made / attempted:.1%})"
+
+
+def _leader(players, key, label):
+    best = max(players, key=lambda player: _stat(player, key))
+    value = _stat(best, key)
+    if not value:
+        return None
+    return f"{best['name']} {value} {label}"
+
+
+def build_team_facts(team):
+    players = team["players"]
+    name = team["team"] or "Team"
+    facts = []
+
+    scorer = max(players, key=lambda player: _stat(player, "PTS"))
+    scorer_line = f"{name} leading scorer: {scorer['name']} {_stat(scorer, 'PTS')} PTS"
+    field_goals = scorer["stats"].get("FG")
+    if field_goals and MADE_ATTEMPTED_RE.match(field_goals):
+        scorer_line += f" ({field_goals} FG)"
+    facts.append(scorer_line)
+
+    leaders = [
+        leader
+        for leader in (
+            _leader(players, "REB", "REB"),
+            _leader(players, "AST", "AST"),
+        )
+        if leader
+    ]
+    if leaders:
+        facts.append(f"{name} leaders: {', '.join(leaders)}")
+
+    totals = team.get("totals") or {}
+    shooting = [
+        line
+        for line in (
+            _shooting_line(totals, "FG", "FG"),
+            _shooting_line(totals, "3PT", "3PT"),
+            _shooting_line(totals, "FT", "FT"),
+        )
+        if line
+    ]
+    if shooting:
+        facts.append(f"{name} shooting: {', '.join(shooting)}")
+
+    bench = [player for player in players if not player["starter"]]
+    if bench:
+        bench_points = sum(_stat(player, "PTS") for player in bench)
+        facts.append(f"{name} bench points: {bench_points}")
+    return facts
+
+
+def build_boxscore_facts(html, teams):
+    facts = {}
+    unnamed = []
+    for parsed in parse_boxscore_html(html):
+        label = parsed["team"]
+        for team_name in teams:
+            if label and (
+                matches_team(label, [team_name]) or matches_team(team_name, [label])
+            ):
+                label = team_name
+                break
+        if not label:
+            unnamed.append(parsed)
+            continue
+        parsed["team"] = label
+        facts[label] = build_team_facts(parsed)
+
+    # Cards without a readable title follow ESPN's display order (away team
+    # first); `teams` is stored home first.
+    remaining = [team_name for team_name in reversed(teams) if team_name not in facts]
+    for parsed, team_name in zip(unnamed, remaining):
+        parsed["team"] = team_name
+        facts[team_name] = build_team_facts(parsed)
+    return facts
+
+
+def find_team_facts(boxscore_facts, focus_team):
+    for team_name, team_facts in (boxscore_facts or {}).items():
+        if matches_team(focus_team, [team_name]) or matches_team(team_name, [focus_team]):
+            return team_name, team_facts
+    return None, []
+
+
+def select_prompt_facts(boxscore_facts, focus_team):
+    team_name, team_facts = find_team_facts(boxscore_facts, focus_team)
+    if not team_facts:
+        return []
+    selected = list(team_facts)
+    for other_name, other_facts in boxscore_facts.items():
+        if other_name != team_name and other_facts:
+            selected.append(other_facts[0])
+    return selected
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+from .common import get_env, log_info, log_warning
+
+
+class JsonlCheckpoint:
+    def __init__(self, path, run_id):
+        self.path = Path(path)
+        self.run_id = run_id
+        self._lock = threading.Lock()
+        self._records = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        stale = 0
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as file_handle:
+                for line in file_handle:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash mid-write leaves at most one torn line.
+                        continue
+                    if record.get("run_id") != run_id:
+                        stale += 1
+                        continue
+                    self._records[tuple(record["key"])] = record
+        if stale:
+            log_warning(f"Discarding {stale} checkpoint records from another run at {self.path}")
+            self._rewrite()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _rewrite(self):
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file_handle:
+            for record in self._records.values():
+                file_handle.write(json.dumps(record) + "\n")
+            file_handle.flush()
+            os.fsync(file_handle.fileno())
+        os.replace(tmp_path, self.path)
+
+    def completed(self):
+        with self._lock:
+            return {key: record for key, record in self._records.items() if record["done"]}
+
+    def records(self):
+        with self._lock:
+            return dict(self._records)
+
+    def append(self, key, done, take=None, error=None):
+        record = {
+            "run_id": self.run_id,
+            "key": list(key),
+            "done": done,
+            "take": take,
+            "error": error,
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            previous = self._records.get(tuple(key))
+            if previous is not None and previous["done"] and not done:
+                return
+            self._records[tuple(key)] = record
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def open_checkpoint_from_env(run_id):
+    path = get_env("GENERATE_CHECKPOINT_PATH", default=".cache/checkpoints/generate_takes.jsonl")
+    if not path:
+        return None
+    checkpoint = JsonlCheckpoint(path, run_id)
+    log_info(f"Checkpointing to {path} (run_id={run_id})")
+    return checkpoint
@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class RateLimiter:
+    def __init__(self, min_interval=0.0, max_per_minute=0):
+        interval = float(min_interval or 0)
+        if max_per_minute and max_per_minute > 0:
+            interval = max(interval, 60.0 / max_per_minute)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        if self.interval <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+def run_jobs(jobs, worker, concurrency=1, rate_limiter=None, deadline=None):
+    # Jobs start in list order, so callers sort by priority. Jobs that have
+    # not started by `deadline` (a time.monotonic() value) are skipped and
+    # yield DeadlineExceeded instead of a result.
+    def past_deadline():
+        return deadline is not None and time.monotonic() >= deadline
+
+    def run_one(job):
+        if past_deadline():
+            return DeadlineExceeded()
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+            if past_deadline():
+                return DeadlineExceeded()
+        try:
+            return worker(job)
+        except Exception as exc:
+            return exc
+
+    if concurrency <= 1 or len(jobs) <= 1:
+        return [run_one(job) for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run_one, jobs))
@@ -0,0 +1,140 @@
+import re
+
+
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+SCORE_RE = re.compile(r"\b\d{2,3}-\d{2,3}\b")
+STAT_RE = re.compile(
+    r"\b\d+\s+(?:points|rebounds|assists|steals|blocks|turnovers|3-pointers|"
+    r"threes|minutes|shots|free throws)\b",
+    re.IGNORECASE,
+)
+NAME_RE = re.compile(r"\b[A-Z][a-z'.-]+(?:\s+[A-Z][a-zA-Z'.-]+)+")
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he his in is it its "
+    "of on or she that the their they this to was were with who after before "
+    "when while into over than then".split()
+)
+
+WEIGHTS = {
+    "numbers": 0.6,
+    "stat_lines": 1.5,
+    "scores": 2.0,
+    "names": 1.0,
+    "teams": 0.5,
+}
+DENSITY_CHARS = 120
+
+
+def sentence_tokens(sentence):
+    return {
+        token
+        for token in TOKEN_RE.findall(sentence.lower())
+        if token not in STOPWORDS and len(token) > 1
+    }
+
+
+def token_overlap(tokens, other_tokens):
+    if not tokens or not other_tokens:
+        return 0.0
+    return len(tokens & other_tokens) / len(tokens | other_tokens)
+
+
+def token_containment(tokens, other_tokens):
+    if not tokens or not other_tokens:
+        return 0.0
+    return len(tokens & other_tokens) / min(len(tokens), len(other_tokens))
+
+
+def filter_near_duplicates(sentences, threshold, min_tokens=4):
+    if threshold <= 0:
+        return list(sentences)
+
+    sentences = list(sentences)
+    tokens = [sentence_tokens(sentence) for sentence in sentences]
+    # Cluster every near-duplicate pair (union-find) so that no two kept
+    # sentences can still be near duplicates of each other.
+    parent = list(range(len(sentences)))
+
+    def root(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for index, current in enumerate(tokens):
+        if len(current) < min_tokens:
+            continue
+        for other_index in range(index):
+            other = tokens[other_index]
+            if len(other) >= min_tokens and token_containment(current, other) >= threshold:
+                parent[root(index)] = root(other_index)
+
+    # Recaps restate the lede with more detail later on; each cluster keeps
+    # its fullest wording in the position the fact first appeared.
+    best = {}
+    for index in range(len(sentences)):
+        cluster = root(index)
+        if cluster not in best or len(tokens[index]) > len(tokens[best[cluster]]):
+            best[cluster] = index
+    first_seen = {}
+    for index in range(len(sentences)):
+        first_seen.setdefault(root(index), index)
+    return [sentences[best[cluster]] for cluster in sorted(best, key=first_seen.get)]
+
+
+def sentence_features(sentences, team_counts=None):
+    team_counts = team_counts or [0] * len(sentences)
+    return {
+        "numbers": [len(NUMBER_RE.findall(sentence)) for sentence in sentences],
+        "stat_lines": [len(STAT_RE.findall(sentence)) for sentence in sentences],
+        "scores": [len(SCORE_RE.findall(sentence)) for sentence in sentences],
+        "names": [len(NAME_RE.findall(sentence)) for sentence in sentences],
+        "teams": list(team_counts),
+        "chars": [len(sentence) for sentence in sentences],
+    }
+
+
+def score_sentences(sentences, team_counts=None):
+    features = sentence_features(sentences, team_counts)
+    raw = [0.0] * len(sentences)
+    for name, weight in WEIGHTS.items():
+        column = features[name]
+        raw = [total + weight * value for total, value in zip(raw, column)]
+    return [
+        total / max(1.0, chars / DENSITY_CHARS)
+        for total, chars in zip(raw, features["chars"])
+    ]
+
+
+def select_ranked(sentences, scores, max_sentences, char_budget):
+    tokens = [sentence_tokens(sentence) for sentence in sentences]
+    remaining = list(range(len(sentences)))
+    chosen = []
+    used_chars = 0
+
+    while remaining and len(chosen) < max_sentences:
+        best_index = None
+        best_value = None
+        for index in remaining:
+            if char_budget and used_chars + len(sentences[index]) > char_budget:
+                continue
+            novelty = 1.0 - max(
+                (token_overlap(tokens[index], tokens[other]) for other in chosen),
+                default=0.0,
+            )
+            value = scores[index] * novelty
+            if best_value is None or value > best_value:
+                best_index, best_value = index, value
+        if best_index is None:
+            break
+        chosen.append(best_index)
+        used_chars += len(sentences[best_index])
+        remaining.remove(best_index)
+
+    if not chosen and sentences:
+        best_index = max(range(len(sentences)), key=lambda index: scores[index])
+        chosen.append(best_index)
+
+    return sorted(chosen)
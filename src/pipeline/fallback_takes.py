@@ -0,0 +1,59 @@
+from .boxscore_utils import find_team_facts
+from .style_utils import normalize_style, pick_style
+
+
+STYLE_TEMPLATES = {
+    "factual": "{lead} {detail}",
+    "hot_takes": "{team} fans, this one speaks for itself. {lead} {detail}",
+    "analytical": "By the numbers for the {team}: {detail} {lead}",
+    "nuanced": "There is more than one way to read this {team} game. {lead} {detail}",
+}
+
+
+def _sentence(text):
+    text = (text or "").strip()
+    if text and text[-1] not in ".!?":
+        text += "."
+    return text
+
+
+def _lead_fact(game):
+    facts = game.get("facts") or []
+    scores = game.get("fact_scores") or []
+    if not facts:
+        return ""
+    if len(scores) == len(facts):
+        return facts[max(range(len(facts)), key=scores.__getitem__)]
+    return facts[0]
+
+
+def _detail_fact(game, focus_team, lead):
+    _, team_facts = find_team_facts(game.get("boxscore_facts"), focus_team)
+    if team_facts:
+        return team_facts[0]
+    for fact in game.get("facts") or []:
+        if fact != lead:
+            return fact
+    return ""
+
+
+def _truncate_words(text, max_words):
+    words = text.split()
+    if not max_words or len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words]).rstrip(",;:") + "..."
+
+
+def build_fallback_text(game, focus_team, style_key, max_words):
+    lead = _lead_fact(game)
+    if not lead:
+        return ""
+    style_key = normalize_style(style_key)
+    if style_key not in STYLE_TEMPLATES:
+        style_key = pick_style(sorted(STYLE_TEMPLATES), game.get("game_id"), focus_team)
+    text = STYLE_TEMPLATES[style_key].format(
+        team=focus_team,
+        lead=_sentence(lead),
+        detail=_sentence(_detail_fact(game, focus_team, lead)),
+    )
+    return _truncate_words(" ".join(text.split()), max_words)
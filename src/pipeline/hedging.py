@@ -0,0 +1,167 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .common import log_info, percentile
+
+
+class HedgeAttempt:
+    # One of the racing calls. The call attaches its response once headers
+    # arrive so the winning thread can close it mid-body.
+    def __init__(self, hedge):
+        self.hedge = hedge
+        self._lock = threading.Lock()
+        self._response = None
+        self._cancelled = False
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def attach(self, response):
+        with self._lock:
+            self._response = response
+            cancelled = self._cancelled
+        if cancelled:
+            response.close()
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            response = self._response
+        if response is not None:
+            response.close()
+
+
+class Hedger:
+    def __init__(
+        self,
+        hedge_percentile,
+        max_fraction,
+        min_samples=10,
+        window=50,
+        max_workers=8,
+    ):
+        self.hedge_percentile = hedge_percentile
+        self.max_fraction = max_fraction
+        self.min_samples = min_samples
+        self._latencies = {}
+        self._window = window
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._abandoned = []
+        self.counters = {
+            "requests": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "losers_cancelled": 0,
+            "losers_finished": 0,
+            "saved_seconds": 0.0,
+        }
+
+    def hedge_delay(self, key):
+        with self._lock:
+            samples = list(self._latencies.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, self.hedge_percentile)
+
+    def _record_latency(self, key, seconds):
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def _reserve_hedge(self):
+        with self._lock:
+            if self.counters["hedged"] + 1 > self.max_fraction * self.counters["requests"]:
+                return False
+            self.counters["hedged"] += 1
+            return True
+
+    def _submit(self, key, call, attempt):
+        def timed():
+            started = time.monotonic()
+            try:
+                return call(attempt)
+            finally:
+                # A cancelled loser's latency is cut short, not a real sample.
+                if not attempt.is_cancelled():
+                    self._record_latency(key, time.monotonic() - started)
+
+        return self._executor.submit(timed)
+
+    def _record_saving(self, won_at):
+        def callback(_future):
+            with self._lock:
+                self.counters["losers_finished"] += 1
+                self.counters["saved_seconds"] += max(0.0, time.monotonic() - won_at)
+
+        return callback
+
+    def _cancel_loser(self, loser, attempt):
+        # A streamed loser is closed as soon as it has a response, which drops
+        # the connection and stops the provider generating the rest.
+        won_at = time.monotonic()
+        attempt.cancel()
+        if loser.cancel():
+            return
+        with self._lock:
+            self.counters["losers_cancelled"] += 1
+            self._abandoned.append((loser, won_at))
+        loser.add_done_callback(self._record_saving(won_at))
+
+    def run(self, key, call, accept):
+        with self._lock:
+            self.counters["requests"] += 1
+        delay = self.hedge_delay(key)
+        primary_attempt = HedgeAttempt(hedge=False)
+        primary = self._submit(key, call, primary_attempt)
+        if delay is None:
+            return primary.result()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._reserve_hedge():
+            return primary.result()
+
+        hedge_attempt = HedgeAttempt(hedge=True)
+        hedge = self._submit(key, call, hedge_attempt)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None or not accept(future.result()):
+                    continue
+                if future is hedge:
+                    with self._lock:
+                        self.counters["hedge_wins"] += 1
+                    if primary in pending:
+                        self._cancel_loser(primary, primary_attempt)
+                elif hedge in pending:
+                    self._cancel_loser(hedge, hedge_attempt)
+                return future.result()
+        return primary.result()
+
+    def close(self):
+        # Losers still record their (cancelled) calls in telemetry, so wait
+        # for them before the stage summarizes spend.
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self.counters)
+            # Losers still running have saved at least the time since the
+            # hedge won.
+            stats["saved_seconds"] += sum(
+                now - won_at for future, won_at in self._abandoned if not future.done()
+            )
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        requests = stats["requests"] or 1
+        log_info(
+            f"LLM hedging: p{self.hedge_percentile:g} requests={stats['requests']} "
+            f"hedged={stats['hedged']} ({stats['hedged'] / requests:.1%}) "
+            f"hedge_wins={stats['hedge_wins']} "
+            f"losers_cancelled={stats['losers_cancelled']} "
+            f"saved>={stats['saved_seconds']:.1f}s"
+        )
@@ -1,6 +1,16 @@
 import random
+import threading
 import time
-import requests
+from urllib.parse import urlsplit
+
+from .common import log_info, percentile
+
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+_STATS = {}
+_STATS_LOCK = threading.Lock()
+_SESSIONS = threading.local()
 
 
 def _exponential_backoff(attempt, base_delay, max_delay, jitter_max):
@@ -15,6 +25,144 @@ def _fixed_backoff(base_delay):
     return base_delay
 
 
+def _get_session():
+    session = getattr(_SESSIONS, "session", None)
+    if session is None:
+        import requests
+
+        session = requests.Session()
+        _SESSIONS.session = session
+    return session
+
+
+def _connection_count(session, url):
+    try:
+        pools = session.get_adapter(url).poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+    except Exception:
+        return None
+
+
+def _new_host_stats():
+    return {
+        "requests": 0,
+        "attempts": 0,
+        "statuses": {},
+        "errors": {},
+        "retries_by_status": {},
+        "retries_by_error": {},
+        "backoff_seconds": 0.0,
+        "response_bytes": 0,
+        "new_connections": 0,
+        "reused_connections": 0,
+        "latencies_ms": [],
+    }
+
+
+def _host_stats(host):
+    stats = _STATS.get(host)
+    if stats is None:
+        stats = _new_host_stats()
+        _STATS[host] = stats
+    return stats
+
+
+def _record_attempt(host, latency_ms, status=None, error=None, response_bytes=0, reused=None):
+    with _STATS_LOCK:
+        stats = _host_stats(host)
+        stats["attempts"] += 1
+        stats["latencies_ms"].append(latency_ms)
+        stats["response_bytes"] += response_bytes
+        if status is not None:
+            key = str(status)
+            stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+        if error is not None:
+            stats["errors"][error] = stats["errors"].get(error, 0) + 1
+        if reused is True:
+            stats["reused_connections"] += 1
+        elif reused is False:
+            stats["new_connections"] += 1
+
+
+def _record_retry(host, delay, status=None, error=None):
+    with _STATS_LOCK:
+        stats = _host_stats(host)
+        stats["backoff_seconds"] += delay
+        if status is not None:
+            bucket = stats["retries_by_status"]
+            bucket[str(status)] = bucket.get(str(status), 0) + 1
+        if error is not None:
+            bucket = stats["retries_by_error"]
+            bucket[error] = bucket.get(error, 0) + 1
+
+
+def record_response_bytes(url, count):
+    with _STATS_LOCK:
+        _host_stats(urlsplit(url).netloc or url)["response_bytes"] += count
+
+
+def _record_request(host):
+    with _STATS_LOCK:
+        _host_stats(host)["requests"] += 1
+
+
+def _latency_histogram(latencies):
+    counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for latency in latencies:
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def get_http_stats():
+    with _STATS_LOCK:
+        snapshot = {
+            host: dict(stats, latencies_ms=list(stats["latencies_ms"]))
+            for host, stats in _STATS.items()
+        }
+
+    summary = {}
+    for host, stats in snapshot.items():
+        latencies = stats.pop("latencies_ms")
+        stats["latency_ms"] = {
+            "count": len(latencies),
+            "p50": round(percentile(latencies, 50), 1),
+            "p90": round(percentile(latencies, 90), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "max": round(max(latencies), 1) if latencies else 0.0,
+            "total": round(sum(latencies), 1),
+            "histogram": _latency_histogram(latencies),
+        }
+        stats["backoff_seconds"] = round(stats["backoff_seconds"], 3)
+        summary[host] = stats
+    return summary
+
+
+def reset_http_stats():
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+def log_http_stats():
+    for host, stats in sorted(get_http_stats().items()):
+        latency = stats["latency_ms"]
+        log_info(
+            f"HTTP {host}: requests={stats['requests']} attempts={stats['attempts']} "
+            f"p50={latency['p50']}ms p90={latency['p90']}ms p99={latency['p99']}ms "
+            f"max={latency['max']}ms backoff={stats['backoff_seconds']}s "
+            f"bytes={stats['response_bytes']} "
+            f"connections_new={stats['new_connections']} "
+            f"connections_reused={stats['reused_connections']} "
+            f"statuses={stats['statuses']} retries_by_status={stats['retries_by_status']} "
+            f"errors={stats['errors']}"
+        )
+
+
 def request_with_retry(
     method,
     url,
@@ -29,35 +177,66 @@ def request_with_retry(
     base_delay=1,
     max_delay=10,
     jitter_max=0,
+    stream=False,
 ):
+    import requests
+
     if retry_statuses is None:
         retry_statuses = set()
 
+    host = urlsplit(url).netloc or url
+    session = _get_session()
+    _record_request(host)
+
     for attempt in range(max_retries + 1):
+        connections_before = _connection_count(session, url)
+        started = time.perf_counter()
         try:
-            response = requests.request(
+            response = session.request(
                 method,
                 url,
                 headers=headers,
                 params=params,
                 json=json,
                 timeout=timeout,
+                stream=stream,
             )
-        except requests.RequestException:
+        except requests.RequestException as exc:
+            error = type(exc).__name__
+            _record_attempt(host, (time.perf_counter() - started) * 1000, error=error)
             if attempt >= max_retries:
                 raise
             if backoff_type == "fixed":
                 delay = _fixed_backoff(base_delay)
             else:
                 delay = _exponential_backoff(attempt + 1, base_delay, max_delay, jitter_max)
+            _record_retry(host, delay, error=error)
             time.sleep(delay)
             continue
 
+        latency_ms = (time.perf_counter() - started) * 1000
+        connections_after = _connection_count(session, url)
+        reused = None
+        if connections_before is not None and connections_after is not None:
+            reused = connections_after == connections_before
+        # A streamed success body is left for the caller to consume; it
+        # reports the bytes it read through record_response_bytes.
+        streamed = stream and response.status_code == 200
+        _record_attempt(
+            host,
+            latency_ms,
+            status=response.status_code,
+            response_bytes=0 if streamed else len(response.content or b""),
+            reused=reused,
+        )
+        response.attempts = attempt + 1
+
         if response.status_code in retry_statuses and attempt < max_retries:
             if backoff_type == "fixed":
                 delay = _fixed_backoff(base_delay)
             else:
                 delay = _exponential_backoff(attempt + 1, base_delay, max_delay, jitter_max)
+            _record_retry(host, delay, status=response.status_code)
             time.sleep(delay)
             continue
 
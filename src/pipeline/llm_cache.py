@@ -0,0 +1,167 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .common import get_env, log_info
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def make_cache_key(model, messages, temperature, max_tokens, prompt_version):
+    material = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "prompt_version": prompt_version,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path, ttl_seconds, max_bytes, bypass=False):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def get(self, key):
+        if self.bypass:
+            with self._lock:
+                self.counters["bypassed"] += 1
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, model, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            content, model, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+            self.counters["hits"] += 1
+            return content, model
+
+    def put(self, key, model, content):
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, model, content, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, content, size, now, now),
+                )
+            self.counters["stores"] += 1
+            self._evict()
+
+    def _evict(self):
+        with self._conn:
+            if self.ttl_seconds:
+                expired = self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,),
+                ).rowcount
+                self.counters["evictions"] += max(expired, 0)
+            if not self.max_bytes:
+                return
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                self.counters["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return dict(self.counters, entries=entries, bytes=total)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_llm_cache_from_env():
+    path = get_env("LLM_CACHE_PATH", default=".cache/llm/responses.sqlite3")
+    if not path:
+        return None
+    ttl_seconds = float(get_env("LLM_CACHE_TTL_SECONDS", default="172800"))
+    max_bytes = int(get_env("LLM_CACHE_MAX_BYTES", default=str(50 * 1024 * 1024)))
+    bypass = get_env("LLM_CACHE_BYPASS", default="").strip().lower() in ("1", "true", "yes")
+    log_info(
+        f"LLM cache at {path} (ttl={ttl_seconds:.0f}s max_bytes={max_bytes} bypass={bypass})"
+    )
+    return LLMCache(path, ttl_seconds, max_bytes, bypass=bypass)
+
+
+def log_llm_cache_stats(cache):
+    if cache is None:
+        return
+    stats = cache.stats()
+    log_info(
+        "LLM cache: hits=%d misses=%d expired=%d bypassed=%d stores=%d evictions=%d "
+        "entries=%d bytes=%d"
+        % (
+            stats["hits"],
+            stats["misses"],
+            stats["expired"],
+            stats["bypassed"],
+            stats["stores"],
+            stats["evictions"],
+            stats["entries"],
+            stats["bytes"],
+        )
+    )
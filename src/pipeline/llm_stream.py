@@ -0,0 +1,123 @@
+import json
+import re
+
+from .http_utils import record_response_bytes
+from .token_utils import estimate_tokens
+
+
+INSUFFICIENT_PREFIX = "INSUFFIC"
+INSUFFICIENT_MARKER = "INSUFFICIENT FACTS"
+# A sentence end only counts once the next token has started, so "3." in
+# "3.5" or "vs." split across chunks is not mistaken for a boundary.
+SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*(?=\s)")
+WORD_RE = re.compile(r"\S+")
+
+
+def iter_sse_events(lines):
+    for line in lines:
+        if not line or line.startswith(":") or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            yield json.loads(data)
+        except ValueError:
+            continue
+
+
+def _budget_word(text, max_words):
+    for index, match in enumerate(WORD_RE.finditer(text), start=1):
+        if index == max_words:
+            return match
+    return None
+
+
+def _cut_text(text, max_words, slack_words):
+    # Returns the text to keep once the word budget is spent, or None while
+    # the stream should keep going.
+    budget_word = _budget_word(text, max_words)
+    if budget_word is None:
+        return None
+    budget_offset = budget_word.end()
+    boundary = SENTENCE_END_RE.search(text, budget_word.start())
+    if boundary is not None:
+        return text[: boundary.end()]
+    if len(WORD_RE.findall(text)) < max_words + slack_words:
+        return None
+    boundaries = list(SENTENCE_END_RE.finditer(text, 0, budget_offset))
+    if boundaries:
+        return text[: boundaries[-1].end()]
+    return text[:budget_offset].rstrip(",;:") + "..."
+
+
+def _is_insufficient(text):
+    normalized = text.lstrip().upper()
+    if len(normalized) >= len(INSUFFICIENT_PREFIX) and normalized.startswith(
+        INSUFFICIENT_PREFIX
+    ):
+        return True
+    return INSUFFICIENT_MARKER in normalized
+
+
+def read_stream(response, model, max_words, slack_words=15, cancelled=None):
+    parts = []
+    usage = None
+    error = None
+    stop_reason = "complete"
+    text = ""
+    received = 0
+
+    def lines():
+        nonlocal received
+        for line in response.iter_lines():
+            received += len(line) + 1
+            yield line.decode("utf-8", "replace")
+
+    try:
+        for event in iter_sse_events(lines()):
+            if cancelled is not None and cancelled():
+                stop_reason = "cancelled"
+                break
+            if "error" in event:
+                error = (event.get("error") or {}).get("message", "unknown_error")
+                stop_reason = "error"
+                break
+            if event.get("usage"):
+                usage = event["usage"]
+            for choice in event.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+            if not parts:
+                continue
+            text = "".join(parts)
+            if _is_insufficient(text):
+                stop_reason = "insufficient_facts"
+                break
+            if max_words:
+                cut = _cut_text(text, max_words, slack_words)
+                if cut is not None:
+                    text = cut
+                    stop_reason = "word_budget"
+                    break
+    except Exception:
+        # A hedge loser is closed from the winning thread, which can surface
+        # as a read error here; the partial text still counts as billed.
+        if cancelled is None or not cancelled():
+            raise
+        stop_reason = "cancelled"
+    finally:
+        # Closing mid-stream drops the connection, which is what stops the
+        # provider generating (and billing) the rest of the completion.
+        response.close()
+        record_response_bytes(response.url, received)
+
+    if usage is None:
+        usage = {"completion_tokens": estimate_tokens(text, model), "estimated": True}
+    return {
+        "content": text.strip(),
+        "usage": usage,
+        "error": error,
+        "stop_reason": stop_reason,
+    }
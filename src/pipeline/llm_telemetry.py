@@ -0,0 +1,121 @@
+import threading
+
+from .common import log_info, percentile
+
+
+class LLMTelemetry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = []
+        self.cache_hits = 0
+
+    def record_call(
+        self,
+        *,
+        game_id,
+        slots,
+        model,
+        latency_ms,
+        status=None,
+        error=None,
+        response=None,
+        usage=None,
+        estimated_prompt_tokens=None,
+        stop_reason=None,
+        hedge=False,
+    ):
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        prompt_estimated = False
+        if (
+            prompt_tokens is None
+            and status == 200
+            and estimated_prompt_tokens is not None
+        ):
+            # Streams without a usage event report no prompt count; the
+            # offline estimate keeps per-take token totals meaningful.
+            prompt_tokens = estimated_prompt_tokens
+            prompt_estimated = True
+        record = {
+            "game_id": game_id,
+            "slots": [list(slot) for slot in slots],
+            "model": model,
+            "status": status,
+            "error": error,
+            "latency_ms": round(latency_ms, 1),
+            "attempts": getattr(response, "attempts", 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": usage.get("completion_tokens"),
+            "cost": usage.get("cost"),
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+            "estimated": prompt_estimated or bool(usage.get("estimated")),
+            "stop_reason": stop_reason,
+            "hedge": hedge,
+        }
+        with self._lock:
+            self.calls.append(record)
+
+    def record_cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def summarize(self, takes_count):
+        with self._lock:
+            calls = list(self.calls)
+            cache_hits = self.cache_hits
+        summary = summarize_calls(calls)
+        summary["cache_hits"] = cache_hits
+        summary["takes"] = takes_count
+        divisor = takes_count or 1
+        summary["calls_per_take"] = round(summary["calls"] / divisor, 3)
+        summary["prompt_tokens_per_take"] = round(summary["prompt_tokens"] / divisor, 1)
+        summary["completion_tokens_per_take"] = round(
+            summary["completion_tokens"] / divisor, 1
+        )
+        summary["by_model"] = {}
+        for model in sorted({call["model"] for call in calls}):
+            summary["by_model"][model] = summarize_calls(
+                [call for call in calls if call["model"] == model]
+            )
+        return summary
+
+
+def summarize_calls(calls):
+    latencies = [call["latency_ms"] for call in calls]
+    return {
+        "calls": len(calls),
+        "hedge_calls": sum(1 for call in calls if call.get("hedge")),
+        "failed_calls": sum(1 for call in calls if call["status"] != 200),
+        "retries": sum(max(0, (call["attempts"] or 1) - 1) for call in calls),
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies, default=0.0),
+        },
+        "prompt_tokens": sum(call["prompt_tokens"] or 0 for call in calls),
+        "completion_tokens": sum(call["completion_tokens"] or 0 for call in calls),
+        "cost": round(sum(call["cost"] or 0 for call in calls), 6),
+        "estimated_token_calls": sum(1 for call in calls if call.get("estimated")),
+        "early_stops": sum(
+            1
+            for call in calls
+            if call["stop_reason"] in ("word_budget", "insufficient_facts")
+        ),
+    }
+
+
+def log_telemetry_summary(summary):
+    latency = summary["latency_ms"]
+    log_info(
+        f"LLM telemetry: calls={summary['calls']} hedge_calls={summary['hedge_calls']} "
+        f"failed={summary['failed_calls']} "
+        f"retries={summary['retries']} cache_hits={summary['cache_hits']} "
+        f"p50={latency['p50']:.0f}ms p95={latency['p95']:.0f}ms "
+        f"prompt_tokens={summary['prompt_tokens']} "
+        f"completion_tokens={summary['completion_tokens']} "
+        f"tokens_per_take={summary['prompt_tokens_per_take']}"
+        f"+{summary['completion_tokens_per_take']} "
+        f"estimated_token_calls={summary['estimated_token_calls']} "
+        f"cost={summary['cost']} "
+        f"early_stops={summary['early_stops']}"
+    )
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import deque
+
+from .common import log_info, percentile
+
+
+FAILOVER_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class ModelRouter:
+    def __init__(self, models, window=20, cooldown_seconds=60.0, max_error_rate=0.5):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model.")
+        self.models = list(models)
+        self.window = window
+        self.cooldown_seconds = cooldown_seconds
+        self.max_error_rate = max_error_rate
+        self._lock = threading.Lock()
+        self._stats = {
+            model: {
+                "latencies": deque(maxlen=window),
+                "outcomes": deque(maxlen=window),
+                "cooldown_until": 0.0,
+                "requests": 0,
+                "failures": 0,
+                "failovers": 0,
+                "reasons": {},
+            }
+            for model in self.models
+        }
+
+    def _healthy(self, stats, now):
+        if stats["cooldown_until"] > now:
+            return False
+        outcomes = stats["outcomes"]
+        if len(outcomes) >= 4:
+            error_rate = outcomes.count(False) / len(outcomes)
+            if error_rate > self.max_error_rate:
+                return False
+        return True
+
+    def candidates(self):
+        # Fastest healthy model first. Unmeasured models rank ahead so each
+        # one gets probed once; unhealthy models are still tried last rather
+        # than failing the request outright.
+        now = time.monotonic()
+        with self._lock:
+            ranked = []
+            for index, model in enumerate(self.models):
+                stats = self._stats[model]
+                latencies = stats["latencies"]
+                latency = sum(latencies) / len(latencies) if latencies else 0.0
+                ranked.append((not self._healthy(stats, now), latency, index, model))
+        return [model for *_, model in sorted(ranked)]
+
+    def record_success(self, model, latency_ms):
+        with self._lock:
+            stats = self._stats[model]
+            stats["requests"] += 1
+            stats["latencies"].append(latency_ms)
+            stats["outcomes"].append(True)
+
+    def record_failure(self, model, reason, retry_after=None):
+        cooldown = self.cooldown_seconds
+        if retry_after:
+            try:
+                cooldown = max(cooldown, float(retry_after))
+            except ValueError:
+                pass
+        with self._lock:
+            stats = self._stats[model]
+            stats["requests"] += 1
+            stats["failures"] += 1
+            stats["outcomes"].append(False)
+            stats["cooldown_until"] = time.monotonic() + cooldown
+            stats["reasons"][reason] = stats["reasons"].get(reason, 0) + 1
+
+    def record_failover(self, model):
+        with self._lock:
+            self._stats[model]["failovers"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                model: {
+                    "requests": stats["requests"],
+                    "failures": stats["failures"],
+                    "failovers": stats["failovers"],
+                    "p50_ms": percentile(list(stats["latencies"]), 50),
+                    "reasons": dict(stats["reasons"]),
+                }
+                for model, stats in self._stats.items()
+            }
+
+    def log_stats(self):
+        for model, stats in self.get_stats().items():
+            if not stats["requests"]:
+                continue
+            log_info(
+                f"Model {model}: requests={stats['requests']} failures={stats['failures']} "
+                f"failovers={stats['failovers']} p50={stats['p50_ms']:.0f}ms "
+                f"reasons={stats['reasons']}"
+            )
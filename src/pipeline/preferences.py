@@ -0,0 +1,204 @@
+import datetime
+import json
+import os
+from pathlib import Path
+from urllib.parse import quote
+
+from .common import log_info, log_warning
+from .supabase_utils import ensure_selected, with_query_param
+
+
+SNAPSHOT_VERSION = "v1"
+# Keeps `user_id=in.(...)` URLs well under PostgREST/proxy length limits.
+INTEREST_ID_CHUNK = 100
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def load_snapshot(path):
+    try:
+        with open(path, "r", encoding="utf-8") as file_handle:
+            snapshot = json.load(file_handle)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("schema_version") != SNAPSHOT_VERSION:
+        log_warning(f"Ignoring preference snapshot {path} with another schema version")
+        return None
+    return snapshot
+
+
+def write_snapshot(path, snapshot):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot["teams"] = build_team_index(snapshot["users"])
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(snapshot, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def build_team_index(users):
+    teams = {}
+    for user_id, user in users.items():
+        for team in user.get("teams") or []:
+            teams.setdefault(team, []).append(user_id)
+    return {team: sorted(user_ids) for team, user_ids in sorted(teams.items())}
+
+
+def snapshot_rows(snapshot):
+    # Same shapes as the Supabase users and interests rows, so the stages
+    # can use a snapshot in place of a live read.
+    users = []
+    interests = []
+    for user in snapshot["users"].values():
+        row = {key: value for key, value in user.items() if key != "teams"}
+        users.append(row)
+        for team in user.get("teams") or []:
+            interests.append({"user_id": row.get("id"), "team": team})
+    return users, interests
+
+
+def load_preference_rows(path):
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        log_warning(f"No preference snapshot at {path}; reading Supabase directly")
+        return None
+    users, interests = snapshot_rows(snapshot)
+    log_info(
+        f"Loaded preference snapshot {path}: users={len(users)} "
+        f"interests={len(interests)} synced_at={snapshot['synced_at']}"
+    )
+    return users, interests
+
+
+def _read_teams(reader, table, query, user_ids, counters):
+    teams = {}
+    if user_ids is None:
+        chunks = [None]
+    else:
+        chunks = [
+            user_ids[start:start + INTEREST_ID_CHUNK]
+            for start in range(0, len(user_ids), INTEREST_ID_CHUNK)
+        ]
+    for chunk in chunks:
+        chunk_query = query
+        if chunk is not None:
+            chunk_query = with_query_param(query, "user_id", f"in.({','.join(chunk)})")
+        for row in reader.iter_rows(table, chunk_query):
+            if row.get("user_id") is not None and row.get("team"):
+                teams.setdefault(str(row["user_id"]), []).append(row["team"])
+        counters["pages"] += reader.stats[table]["pages"]
+    return teams
+
+
+def sync_snapshot(
+    reader,
+    snapshot,
+    *,
+    users_table,
+    users_query,
+    interests_table,
+    interests_query,
+    full_refresh_seconds,
+    overlap_seconds,
+    deletion_sweep_seconds=0,
+    now=None,
+):
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    users_query = ensure_selected(users_query, "updated_at")
+    counters = {"pages": 0}
+
+    full = snapshot is None or not snapshot.get("cursor")
+    if not full and full_refresh_seconds > 0:
+        full_synced_at = parse_timestamp(snapshot.get("full_synced_at"))
+        full = (
+            full_synced_at is None
+            or (now - full_synced_at).total_seconds() >= full_refresh_seconds
+        )
+
+    if full:
+        users = {}
+        query = users_query
+    else:
+        users = dict(snapshot["users"])
+        # Signups stamp updated_at with the web server's clock, so re-read a
+        # window before the cursor in case a write landed late.
+        since = parse_timestamp(snapshot["cursor"]) - datetime.timedelta(
+            seconds=overlap_seconds
+        )
+        query = with_query_param(
+            users_query, "updated_at", f"gt.{quote(since.isoformat(), safe='')}"
+        )
+
+    changed = {}
+    for row in reader.iter_rows(users_table, query):
+        if row.get("id") is not None:
+            changed[str(row["id"])] = row
+    counters["pages"] += reader.stats[users_table]["pages"]
+
+    # Deletions leave no updated_at trail, so the full refresh drops them. An
+    # optional id-only sweep between refreshes drops them sooner, but it still
+    # pages every user, so it runs on its own interval rather than every sync.
+    sweep = not full and deletion_sweep_seconds > 0
+    if sweep:
+        swept_at = parse_timestamp(snapshot.get("swept_at"))
+        sweep = (
+            swept_at is None
+            or (now - swept_at).total_seconds() >= deletion_sweep_seconds
+        )
+    removed = []
+    if sweep:
+        live_ids = {
+            str(row["id"])
+            for row in reader.iter_rows(
+                users_table, with_query_param(users_query, "select", "id")
+            )
+            if row.get("id") is not None
+        }
+        counters["pages"] += reader.stats[users_table]["pages"]
+        removed = [user_id for user_id in users if user_id not in live_ids]
+        for user_id in removed:
+            del users[user_id]
+        changed = {
+            user_id: row for user_id, row in changed.items() if user_id in live_ids
+        }
+
+    teams = _read_teams(
+        reader,
+        interests_table,
+        interests_query,
+        None if full else sorted(changed),
+        counters,
+    )
+    for user_id, row in changed.items():
+        users[user_id] = dict(row, teams=teams.get(user_id, []))
+
+    stamps = [parse_timestamp(user.get("updated_at")) for user in users.values()]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    cursor = max(stamps).isoformat() if stamps else None
+    synced = {
+        "schema_version": SNAPSHOT_VERSION,
+        "synced_at": now.isoformat(),
+        "full_synced_at": now.isoformat() if full else snapshot.get("full_synced_at"),
+        "swept_at": now.isoformat() if full or sweep else snapshot.get("swept_at"),
+        "cursor": cursor,
+        "users": users,
+    }
+    stats = {
+        "mode": "full" if full else "incremental",
+        "users": len(users),
+        "changed_users": len(changed),
+        "deletion_sweep": sweep,
+        "removed_users": len(removed),
+        "pages": counters["pages"],
+    }
+    return synced, stats
@@ -57,6 +57,7 @@ def build_user_prompt(
     disclaimer,
     focus_team=None,
     boxscore_text=None,
+    boxscore_facts=None,
 ):
     team_line = ", ".join(teams) if teams else "Unknown teams"
     fact_lines = "\n".join(f"- {fact}" for fact in facts)
@@ -73,8 +74,124 @@ def build_user_prompt(
         f"- Factual source disclaimer: {disclaimer}\n"
         "- If facts are insufficient, respond with: INSUFFICIENT FACTS TO GENERATE TAKE\n"
     )
-    if boxscore_text:
+    if boxscore_facts:
+        boxscore_lines = "\n".join(f"- {fact}" for fact in boxscore_facts)
+        prompt = f"{prompt}\nBoxscore facts:\n{boxscore_lines}"
+    elif boxscore_text:
         prompt = f"{prompt}\nBoxscore excerpt:\n{boxscore_text}"
     if focus_team:
         prompt = f"{prompt}\nEnsure takes focus on {focus_team}"
     return prompt
+
+
+def build_batch_user_prompt(
+    *,
+    teams,
+    facts,
+    slots,
+    style_guides,
+    max_words,
+    audience,
+    disclaimer,
+    boxscore_text=None,
+    boxscore_facts=None,
+):
+    team_line = ", ".join(teams) if teams else "Unknown teams"
+    fact_lines = "\n".join(f"- {fact}" for fact in facts)
+    style_lines = "\n".join(
+        f"- {style_key} ({label}): {guidance}"
+        for style_key, label, guidance in style_guides
+    )
+    slot_lines = "\n".join(
+        "- " + json.dumps({"focus_team": focus_team, "style": style_key})
+        for focus_team, style_key in slots
+    )
+    prompt = (
+        "Facts:\n"
+        f"- Teams: {team_line}\n"
+        f"{fact_lines}\n\n"
+        "Instructions:\n"
+        "- League: NBA\n"
+        f"- Max length per take: {max_words} words\n"
+        f"- Audience: {audience}\n"
+        f"- Factual source disclaimer: {disclaimer}\n"
+        "- Write one take for every slot below. Each take focuses on its focus_team "
+        "and follows the tone guidance for its style.\n"
+        "- Respond with JSON only (no markdown, no commentary) in exactly this shape: "
+        '{"takes": [{"focus_team": "...", "style": "...", "take": "..."}]}\n'
+        "- The take text itself follows the output requirements (plain text).\n"
+        "- If facts are insufficient for a slot, set its take to: "
+        "INSUFFICIENT FACTS TO GENERATE TAKE\n\n"
+        f"Styles:\n{style_lines}\n\n"
+        f"Slots:\n{slot_lines}\n"
+    )
+    if boxscore_facts:
+        boxscore_lines = "\n".join(f"- {fact}" for fact in boxscore_facts)
+        prompt = f"{prompt}\nBoxscore facts:\n{boxscore_lines}"
+    elif boxscore_text:
+        prompt = f"{prompt}\nBoxscore excerpt:\n{boxscore_text}"
+    return prompt
+
+
+def shorten_guidance(text, max_words):
+    if not max_words:
+        return ""
+    words = (text or "").split()
+    if len(words) <= max_words:
+        return text
+    return " ".join(words[:max_words]).rstrip(",;:") + "."
+
+
+def _shorten_style_guides(args, max_words):
+    if "style_guides" in args:
+        args["style_guides"] = [
+            (style_key, label, shorten_guidance(guidance, max_words))
+            for style_key, label, guidance in args["style_guides"]
+        ]
+    elif "style_guidance" in args:
+        args["style_guidance"] = shorten_guidance(args["style_guidance"], max_words)
+
+
+def compact_prompt_args(args, budget, count_tokens, fact_scores=None, min_facts=1):
+    # Drop content in priority order until the prompt fits the budget:
+    # boxscore lines, then the lowest-scoring facts, then style guidance.
+    args = dict(args)
+    tokens = count_tokens(args)
+    steps = []
+    if not budget or tokens <= budget:
+        return args, tokens, steps
+
+    while tokens > budget and args.get("boxscore_facts"):
+        args["boxscore_facts"] = args["boxscore_facts"][:-1]
+        tokens = count_tokens(args)
+        if "boxscore" not in steps:
+            steps.append("boxscore")
+    while tokens > budget and args.get("boxscore_text"):
+        text = args["boxscore_text"]
+        args["boxscore_text"] = text[: len(text) // 2].rstrip() if len(text) > 200 else ""
+        tokens = count_tokens(args)
+        if "boxscore" not in steps:
+            steps.append("boxscore")
+
+    facts = list(args.get("facts") or [])
+    if fact_scores and len(fact_scores) == len(facts):
+        scores = list(fact_scores)
+    else:
+        scores = [-index for index in range(len(facts))]
+    while tokens > budget and len(facts) > min_facts:
+        drop = min(range(len(facts)), key=scores.__getitem__)
+        del facts[drop]
+        del scores[drop]
+        args["facts"] = facts
+        tokens = count_tokens(args)
+        if "facts" not in steps:
+            steps.append("facts")
+
+    for max_words in (12, 0):
+        if tokens <= budget:
+            break
+        _shorten_style_guides(args, max_words)
+        tokens = count_tokens(args)
+        if "guidance" not in steps:
+            steps.append("guidance")
+    return args, tokens, steps
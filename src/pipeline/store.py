@@ -0,0 +1,355 @@
+import json
+import sqlite3
+from pathlib import Path
+
+from .common import get_env, log_info
+from .team_utils import build_team_aliases, matches_team, normalize_team
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    game_date TEXT,
+    run_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_games_game_date ON games (game_date);
+CREATE INDEX IF NOT EXISTS idx_games_run_id ON games (run_id);
+
+CREATE TABLE IF NOT EXISTS game_teams (
+    game_id TEXT NOT NULL,
+    team_key TEXT NOT NULL,
+    alias_norm TEXT NOT NULL,
+    PRIMARY KEY (game_id, team_key, alias_norm)
+);
+CREATE INDEX IF NOT EXISTS idx_game_teams_alias ON game_teams (alias_norm);
+CREATE INDEX IF NOT EXISTS idx_game_teams_team ON game_teams (team_key, game_id);
+
+CREATE TABLE IF NOT EXISTS facts (
+    game_id TEXT PRIMARY KEY,
+    game_date TEXT,
+    run_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_facts_game_date ON facts (game_date);
+CREATE INDEX IF NOT EXISTS idx_facts_run_id ON facts (run_id);
+
+CREATE TABLE IF NOT EXISTS takes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_id TEXT NOT NULL,
+    game_date TEXT,
+    team_key TEXT NOT NULL,
+    focus_team TEXT,
+    style TEXT NOT NULL,
+    run_id TEXT,
+    payload TEXT NOT NULL,
+    UNIQUE (game_id, team_key, style)
+);
+CREATE INDEX IF NOT EXISTS idx_takes_team_style_date ON takes (team_key, style, game_date);
+CREATE INDEX IF NOT EXISTS idx_takes_game_date ON takes (game_date);
+CREATE INDEX IF NOT EXISTS idx_takes_run_id ON takes (run_id);
+
+CREATE TABLE IF NOT EXISTS deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    email TEXT,
+    payload TEXT NOT NULL,
+    UNIQUE (run_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_user_id ON deliveries (user_id);
+"""
+
+BATCH_SIZE_DEFAULT = 500
+
+
+def open_store(path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def open_store_from_env():
+    path = get_env("PIPELINE_DB_PATH", default="")
+    if not path:
+        return None
+    log_info(f"Writing pipeline records to SQLite store {path}")
+    return open_store(path)
+
+
+def _batch_size():
+    return max(1, int(get_env("PIPELINE_DB_BATCH_SIZE", default=str(BATCH_SIZE_DEFAULT))))
+
+
+def _executemany_batched(conn, statement, rows):
+    batch_size = _batch_size()
+    for start in range(0, len(rows), batch_size):
+        with conn:
+            conn.executemany(statement, rows[start:start + batch_size])
+
+
+def _team_groups(record):
+    groups = {}
+    for side in ("home_team", "away_team"):
+        team = record.get(side) or {}
+        aliases = build_team_aliases(team)
+        if team.get("name") and aliases:
+            groups[normalize_team(team["name"])] = aliases
+    for team_name in record.get("teams") or []:
+        team_key = normalize_team(team_name)
+        if team_key and team_key not in groups:
+            groups[team_key] = [team_name]
+    # Facts and takes only carry the flat game alias list, which names each
+    # team before its nickname and abbreviation (build_game_aliases).
+    team_key = None
+    for alias in record.get("team_aliases") or []:
+        alias_norm = normalize_team(alias)
+        if alias_norm in groups:
+            team_key = alias_norm
+        elif team_key is not None and alias not in groups[team_key]:
+            groups[team_key].append(alias)
+    return groups
+
+
+def _game_team_rows(game_id, record):
+    rows = []
+    for team_key, aliases in _team_groups(record).items():
+        alias_norms = {team_key} | {normalize_team(alias) for alias in aliases}
+        for alias_norm in alias_norms:
+            if alias_norm:
+                rows.append((game_id, team_key, alias_norm))
+    return rows
+
+
+def _take_team_key(take):
+    focus_team = take.get("focus_team") or ""
+    for team_key, aliases in _team_groups(take).items():
+        if focus_team and matches_team(focus_team, aliases):
+            return team_key
+    return normalize_team(focus_team)
+
+
+def _write_game_teams(conn, records):
+    rows = []
+    for record in records:
+        game_id = record.get("game_id")
+        if game_id:
+            rows.extend(_game_team_rows(str(game_id), record))
+    _executemany_batched(
+        conn,
+        "INSERT OR IGNORE INTO game_teams (game_id, team_key, alias_norm) VALUES (?, ?, ?)",
+        rows,
+    )
+
+
+def write_games(conn, run_id, games):
+    rows = [
+        (str(game["game_id"]), game.get("game_date"), run_id, json.dumps(game))
+        for game in games
+        if game.get("game_id")
+    ]
+    _executemany_batched(
+        conn,
+        "INSERT OR REPLACE INTO games (game_id, game_date, run_id, payload) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    _write_game_teams(conn, games)
+    return len(rows)
+
+
+def write_facts(conn, run_id, fact_games):
+    rows = [
+        (str(game["game_id"]), game.get("game_date"), run_id, json.dumps(game))
+        for game in fact_games
+        if game.get("game_id")
+    ]
+    _executemany_batched(
+        conn,
+        "INSERT OR REPLACE INTO facts (game_id, game_date, run_id, payload) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    _write_game_teams(conn, fact_games)
+    return len(rows)
+
+
+def write_takes(conn, run_id, takes):
+    rows = [
+        (
+            str(take["game_id"]),
+            take.get("game_date"),
+            _take_team_key(take),
+            take.get("focus_team"),
+            take.get("style") or "mix",
+            run_id,
+            json.dumps(take),
+        )
+        for take in takes
+        if take.get("game_id")
+    ]
+    _executemany_batched(
+        conn,
+        "INSERT OR REPLACE INTO takes "
+        "(game_id, game_date, team_key, focus_team, style, run_id, payload) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    _write_game_teams(conn, takes)
+    return len(rows)
+
+
+def prune_takes(conn, before):
+    # Keeps the takes table a rolling window; served by idx_takes_game_date.
+    with conn:
+        cursor = conn.execute("DELETE FROM takes WHERE game_date < ?", (before,))
+    return cursor.rowcount
+
+
+def write_deliveries(conn, run_id, deliveries):
+    rows = [
+        (run_id, str(delivery["user_id"]), delivery.get("email"), json.dumps(delivery))
+        for delivery in deliveries
+        if delivery.get("user_id")
+    ]
+    _executemany_batched(
+        conn,
+        "INSERT OR REPLACE INTO deliveries (run_id, user_id, email, payload) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    return len(rows)
+
+
+def resolve_team_keys(conn, team):
+    team_norm = normalize_team(team)
+    if not team_norm:
+        return []
+    keys = {team_norm}
+    for row in conn.execute(
+        "SELECT DISTINCT team_key FROM game_teams WHERE alias_norm = ?", (team_norm,)
+    ):
+        keys.add(row["team_key"])
+    return sorted(keys)
+
+
+def _team_clause(conn, teams, column):
+    keys = set()
+    for team in teams:
+        keys.update(resolve_team_keys(conn, team))
+    if not keys:
+        return "0", []
+    placeholders = ", ".join("?" for _ in keys)
+    return f"{column} IN ({placeholders})", sorted(keys)
+
+
+def _game_team_clause(conn, teams):
+    clause, params = _team_clause(conn, teams, "team_key")
+    return f"game_id IN (SELECT game_id FROM game_teams WHERE {clause})", params
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _build_where(conn, *, game_id=None, teams=None, team_column=None, run_id=None,
+                 date_from=None, date_to=None, extra=None):
+    clauses = []
+    params = []
+    if game_id is not None:
+        clauses.append("game_id = ?")
+        params.append(str(game_id))
+    if teams is not None:
+        if team_column:
+            clause, clause_params = _team_clause(conn, teams, team_column)
+        else:
+            clause, clause_params = _game_team_clause(conn, teams)
+        clauses.append(clause)
+        params.extend(clause_params)
+    if run_id is not None:
+        clauses.append("run_id = ?")
+        params.append(run_id)
+    if date_from:
+        clauses.append("game_date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("game_date < ?")
+        params.append(date_to)
+    for clause, clause_params in extra or []:
+        clauses.append(clause)
+        params.extend(clause_params)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def _select_payloads(conn, table, where, params, order_by, limit):
+    sql = f"SELECT payload FROM {table}{where} ORDER BY {order_by}"
+    if limit:
+        sql += " LIMIT ?"
+        params = params + [int(limit)]
+    return [json.loads(row["payload"]) for row in conn.execute(sql, params)]
+
+
+def query_games(conn, *, game_id=None, team=None, run_id=None, date_from=None,
+                date_to=None, limit=None):
+    where, params = _build_where(
+        conn,
+        game_id=game_id,
+        teams=_as_list(team),
+        run_id=run_id,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return _select_payloads(conn, "games", where, params, "game_date DESC, game_id", limit)
+
+
+def query_facts(conn, *, game_id=None, team=None, run_id=None, date_from=None,
+                date_to=None, limit=None):
+    where, params = _build_where(
+        conn,
+        game_id=game_id,
+        teams=_as_list(team),
+        run_id=run_id,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return _select_payloads(conn, "facts", where, params, "game_date DESC, game_id", limit)
+
+
+def query_takes(conn, *, game_id=None, team=None, style=None, run_id=None,
+                date_from=None, date_to=None, limit=None):
+    extra = []
+    styles = _as_list(style)
+    if styles:
+        placeholders = ", ".join("?" for _ in styles)
+        extra.append((f"style IN ({placeholders})", styles))
+    where, params = _build_where(
+        conn,
+        game_id=game_id,
+        teams=_as_list(team),
+        team_column="team_key",
+        run_id=run_id,
+        date_from=date_from,
+        date_to=date_to,
+        extra=extra,
+    )
+    return _select_payloads(conn, "takes", where, params, "game_date DESC, id", limit)
+
+
+def query_deliveries(conn, *, user_id=None, run_id=None, limit=None):
+    clauses = []
+    params = []
+    if user_id is not None:
+        clauses.append("user_id = ?")
+        params.append(str(user_id))
+    if run_id is not None:
+        clauses.append("run_id = ?")
+        params.append(run_id)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return _select_payloads(conn, "deliveries", where, params, "id DESC", limit)
@@ -1,3 +1,6 @@
+import zlib
+
+
 def normalize_style(value):
     if not value:
         return "mix"
@@ -26,3 +29,9 @@ def style_label(style_key):
         "mix": "Mix",
     }
     return labels.get(style_key, style_key.title())
+
+
+def pick_style(style_keys, *key_parts):
+    # Stable choice across runs and processes (unlike hash()).
+    digest = zlib.crc32("|".join(str(part) for part in key_parts).encode("utf-8"))
+    return style_keys[digest % len(style_keys)]
@@ -0,0 +1,243 @@
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from .common import get_env, log_info, log_warning
+from .http_utils import request_with_retry
+
+
+PAGING_MODES = ("range", "keyset")
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CONTENT_RANGE_RE = re.compile(r"^(?:(\d+)-(\d+)|\*)/(\d+|\*)$")
+
+
+def parse_content_range(value):
+    # "0-999/1000000" -> (0, 999, 1000000); "*/0" -> (None, None, 0).
+    match = CONTENT_RANGE_RE.match((value or "").strip())
+    if not match:
+        return None
+    start, end, total = match.groups()
+    return (
+        int(start) if start is not None else None,
+        int(end) if end is not None else None,
+        int(total) if total != "*" else None,
+    )
+
+
+def _query_params(query):
+    return [part for part in (query or "").split("&") if part]
+
+
+def with_query_param(query, name, value):
+    params = [part for part in _query_params(query) if not part.startswith(f"{name}=")]
+    params.append(f"{name}={value}")
+    return "&".join(params)
+
+
+def ensure_selected(query, column):
+    for part in _query_params(query):
+        if part.startswith("select="):
+            columns = part[len("select="):].split(",")
+            if "*" in columns or column in columns:
+                return query
+            return with_query_param(query, "select", ",".join(columns + [column]))
+    return query
+
+
+def parse_page_key(value):
+    return [column.strip() for column in (value or "").split(",") if column.strip()]
+
+
+def _filter_value(value):
+    # Double quotes keep commas, dots and parentheses in values (team names,
+    # timestamps) from being read as logic-tree syntax.
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return quote(f'"{escaped}"', safe="")
+
+
+def keyset_filter(query, columns, row):
+    if len(columns) == 1:
+        return with_query_param(query, columns[0], f"gt.{row[columns[0]]}")
+    # (a, b) > (x, y) as a PostgREST logic tree: a > x or (a = x and b > y).
+    branches = []
+    for index, column in enumerate(columns):
+        terms = [
+            f"{prior}.eq.{_filter_value(row[prior])}" for prior in columns[:index]
+        ]
+        terms.append(f"{column}.gt.{_filter_value(row[column])}")
+        branches.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return with_query_param(query, "or", f"({','.join(branches)})")
+
+
+class SupabaseReader:
+    def __init__(
+        self,
+        base_url,
+        api_key,
+        page_size=1000,
+        concurrency=4,
+        paging="range",
+        page_key="id",
+        page_keys=None,
+        timeout=20,
+    ):
+        if paging not in PAGING_MODES:
+            raise ValueError(f"SUPABASE_PAGING must be one of {', '.join(PAGING_MODES)}")
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}"}
+        self.page_size = max(1, page_size)
+        self.concurrency = max(1, concurrency)
+        self.paging = paging
+        self.page_key = page_key
+        # Per-table overrides; a comma-separated key is a composite key.
+        self.page_keys = dict(page_keys or {})
+        self.timeout = timeout
+        self.stats = {}
+
+    def _page_columns(self, table):
+        return parse_page_key(self.page_keys.get(table, self.page_key))
+
+    def _get(self, table, query, headers=None):
+        url = f"{self.base_url}/rest/v1/{table}?{query}"
+        response = request_with_retry(
+            "GET",
+            url,
+            headers=dict(self.headers, **(headers or {})),
+            timeout=self.timeout,
+            max_retries=2,
+            retry_statuses=RETRY_STATUSES,
+        )
+        if response.status_code == 416:
+            return response, []
+        if response.status_code not in (200, 206):
+            raise RuntimeError(
+                f"Supabase request failed: {response.status_code} {response.text}"
+            )
+        return response, response.json()
+
+    def _get_range(self, table, query, start, end, count=False):
+        headers = {"Range-Unit": "items", "Range": f"{start}-{end}"}
+        if count:
+            headers["Prefer"] = "count=exact"
+        return self._get(table, query, headers)
+
+    def iter_rows(self, table, query):
+        stats = {"rows": 0, "pages": 0, "total": None}
+        self.stats[table] = stats
+        started = time.monotonic()
+        if self.paging == "keyset":
+            pages = self._iter_keyset_pages(table, query)
+        else:
+            pages = self._iter_range_pages(table, query, stats)
+        for rows in pages:
+            stats["pages"] += 1
+            stats["rows"] += len(rows)
+            yield from rows
+
+        log_info(
+            f"Supabase {table}: rows={stats['rows']} pages={stats['pages']} "
+            f"total={stats['total']} paging={self.paging} "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        if stats["total"] is not None and stats["rows"] != stats["total"]:
+            log_warning(
+                f"Supabase {table} returned {stats['rows']} rows but reported "
+                f"{stats['total']}; the table changed while it was being read"
+            )
+
+    def _iter_range_pages(self, table, query, stats):
+        # Offset pages need a stable order to neither skip nor repeat rows.
+        if not any(part.startswith("order=") for part in _query_params(query)):
+            query = with_query_param(query, "order", ",".join(self._page_columns(table)))
+        response, rows = self._get_range(table, query, 0, self.page_size - 1, count=True)
+        content_range = parse_content_range(response.headers.get("Content-Range"))
+        if content_range is None:
+            # Not a PostgREST response we can page; it is the whole result.
+            yield rows
+            return
+        _, _, total = content_range
+        stats["total"] = total
+        yield rows
+        # PostgREST silently caps pages at its max-rows setting, so the first
+        # page's length is the real page size.
+        page_size = len(rows)
+        if not page_size or total is None or page_size >= total:
+            if total is None and page_size:
+                yield from self._iter_sequential_ranges(table, query, page_size)
+            return
+
+        starts = deque(range(page_size, total, page_size))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            # At most `concurrency` pages are in flight or buffered, so memory
+            # stays bounded however large the table is.
+            pending = deque()
+            while starts or pending:
+                while starts and len(pending) < self.concurrency:
+                    start = starts.popleft()
+                    pending.append(
+                        executor.submit(
+                            self._get_range, table, query, start, start + page_size - 1
+                        )
+                    )
+                _, rows = pending.popleft().result()
+                yield rows
+
+    def _iter_sequential_ranges(self, table, query, page_size):
+        start = page_size
+        while True:
+            _, rows = self._get_range(table, query, start, start + page_size - 1)
+            if not rows:
+                return
+            yield rows
+            if len(rows) < page_size:
+                return
+            start += page_size
+
+    def _iter_keyset_pages(self, table, query):
+        # Sequential, but every page is an index seek rather than an OFFSET
+        # scan, which keeps deep pages cheap on large tables.
+        columns = self._page_columns(table)
+        for column in columns:
+            query = ensure_selected(query, column)
+        query = with_query_param(
+            query, "order", ",".join(f"{column}.asc" for column in columns)
+        )
+        query = with_query_param(query, "limit", str(self.page_size))
+        last_row = None
+        page_size = None
+        while True:
+            page_query = query
+            if last_row is not None:
+                page_query = keyset_filter(query, columns, last_row)
+            _, rows = self._get(table, page_query)
+            if not rows:
+                return
+            yield rows
+            # A max-rows cap below `limit` makes the first page the real size.
+            page_size = page_size or len(rows)
+            if len(rows) < page_size:
+                return
+            if last_row is not None and rows[-1] == last_row:
+                raise RuntimeError(
+                    f"Supabase {table} keyset page did not advance past {last_row}"
+                )
+            last_row = rows[-1]
+
+
+def open_supabase_reader_from_env(base_url, api_key):
+    return SupabaseReader(
+        base_url,
+        api_key,
+        page_size=int(get_env("SUPABASE_PAGE_SIZE", default="1000")),
+        concurrency=int(get_env("SUPABASE_READ_CONCURRENCY", default="4")),
+        paging=get_env("SUPABASE_PAGING", default="range").strip().lower(),
+        page_key=get_env("SUPABASE_PAGE_KEY", default="id"),
+        # The signup form inserts interests as (user_id, team) with no id.
+        page_keys={
+            get_env("SUPABASE_INTERESTS_TABLE", default="interests"): get_env(
+                "SUPABASE_INTERESTS_PAGE_KEY", default="user_id,team"
+            ),
+        },
+    )
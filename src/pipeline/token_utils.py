@@ -0,0 +1,46 @@
+import re
+
+
+# Average characters per BPE token for English prose, by OpenRouter model
+# vendor prefix. Letter runs are divided by this; digits and punctuation are
+# counted separately because tokenizers rarely merge them with words.
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "anthropic": 3.6,
+    "google": 4.0,
+    "meta-llama": 3.9,
+    "mistralai": 3.6,
+    "qwen": 3.7,
+    "deepseek": 3.7,
+    "arcee-ai": 3.8,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.8
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+PIECE_RE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def chars_per_token(model):
+    family = (model or "").split("/", 1)[0].lower()
+    return CHARS_PER_TOKEN.get(family, DEFAULT_CHARS_PER_TOKEN)
+
+
+def estimate_tokens(text, model=None):
+    if not text:
+        return 0
+    ratio = chars_per_token(model)
+    total = 0
+    for piece in PIECE_RE.findall(text):
+        if piece[0].isalpha():
+            total += max(1, round(len(piece) / ratio))
+        else:
+            total += 1
+    return total
+
+
+def estimate_message_tokens(messages, model=None):
+    total = REPLY_PRIMING_TOKENS
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content"), model)
+    return total
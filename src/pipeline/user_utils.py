@@ -0,0 +1,61 @@
+import datetime
+from collections import Counter
+
+from .style_utils import normalize_style
+
+
+def parse_run_date(value):
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        return datetime.date.today()
+
+
+def should_send_user(user_frequency, run_date, weekly_send_day):
+    frequency = (user_frequency or "daily").strip().lower()
+    if frequency != "weekly":
+        return True
+    day_name = run_date.strftime("%A").lower()
+    return day_name == weekly_send_day
+
+
+def build_user_teams(interests):
+    user_teams = {}
+    for interest in interests:
+        user_id = interest.get("user_id")
+        team = interest.get("team")
+        if not user_id or not team:
+            continue
+        user_teams.setdefault(str(user_id), []).append(team)
+    return user_teams
+
+
+def user_skip_reason(user, user_teams, run_date, weekly_send_day):
+    # Mirrors the eligibility checks personalize applies before matching takes.
+    if not str(user.get("id") or "") or not user.get("email"):
+        return "missing_email"
+    if not should_send_user(user.get("frequency"), run_date, weekly_send_day):
+        return "frequency"
+    if not user_teams.get(str(user.get("id"))):
+        return "no_teams"
+    return None
+
+
+def build_demand(users, interests, run_date, weekly_send_day, style_keys=None):
+    user_teams = build_user_teams(interests)
+    demand = Counter()
+    skipped = {}
+    for user in users:
+        if user.get("id") is None:
+            continue
+        style_key = normalize_style(user.get("take_style") or "mix")
+        if style_keys is not None and style_key not in style_keys:
+            continue
+        reason = user_skip_reason(user, user_teams, run_date, weekly_send_day)
+        for team in user_teams.get(str(user.get("id")), []):
+            if reason is None:
+                demand[(team, style_key)] += 1
+            else:
+                skipped.setdefault((team, style_key), Counter())[reason] += 1
+    skipped = {pair: reasons for pair, reasons in skipped.items() if pair not in demand}
+    return demand, skipped
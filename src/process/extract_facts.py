@@ -1,4 +1,9 @@
+import json
+import os
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
 from src.pipeline.common import (
     build_run_id,
@@ -11,6 +16,14 @@ from src.pipeline.common import (
     resolve_run_date,
     write_json,
 )
+from src.pipeline.boxscore_utils import build_boxscore_facts
+from src.pipeline.fact_ranking import (
+    filter_near_duplicates,
+    score_sentences,
+    select_ranked,
+)
+from src.pipeline.store import open_store_from_env, write_facts
+from src.pipeline.team_utils import build_team_aliases
 
 
 def split_sentences(text):
@@ -30,7 +43,92 @@ def sentence_mentions_team(sentence, alias_values):
     return False
 
 
-def select_fact_sentences(paragraphs, team_aliases, max_sentences, max_length):
+def build_alias_groups(recap):
+    team_lookup = {}
+    for side in ("home_team", "away_team"):
+        team = recap.get(side) or {}
+        for alias in build_team_aliases(team):
+            team_lookup.setdefault(alias.lower(), team.get("name") or "")
+
+    groups = {}
+    for alias in recap.get("team_aliases") or []:
+        if alias:
+            groups.setdefault(team_lookup.get(alias.lower(), ""), []).append(alias)
+    return groups
+
+
+def compile_alias_matcher(alias_groups):
+    labels = {}
+    for label, aliases in alias_groups.items():
+        for alias in aliases:
+            alias_value = (alias or "").lower()
+            if alias_value and alias_value not in labels:
+                labels[alias_value] = label
+    if not labels:
+        return None, []
+
+    ordered = sorted(labels, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(alias_value) for alias_value in ordered))
+    entries = [
+        (alias_value, len(alias_value) <= 3, labels[alias_value])
+        for alias_value in ordered
+    ]
+    return pattern, entries
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+def _is_word_boundary(text, index):
+    before = index > 0 and _is_word_char(text[index - 1])
+    after = index < len(text) and _is_word_char(text[index])
+    return before != after
+
+
+def _iter_alias_labels(matcher, sentence):
+    pattern, entries = matcher
+    if pattern is None:
+        return
+    text = sentence.lower()
+    position = 0
+    while True:
+        candidate = pattern.search(text, position)
+        if candidate is None:
+            return
+        start = candidate.start()
+        for alias_value, needs_boundary, label in entries:
+            if not text.startswith(alias_value, start):
+                continue
+            if needs_boundary and not (
+                _is_word_boundary(text, start)
+                and _is_word_boundary(text, start + len(alias_value))
+            ):
+                continue
+            yield label
+        position = start + 1
+
+
+def sentence_matches(matcher, sentence):
+    for _ in _iter_alias_labels(matcher, sentence):
+        return True
+    return False
+
+
+def match_teams(matcher, sentence):
+    return set(_iter_alias_labels(matcher, sentence))
+
+
+def select_scored_facts(
+    paragraphs,
+    team_aliases,
+    max_sentences,
+    max_length,
+    matcher=None,
+    ranking="ranked",
+    char_budget=0,
+    dedupe_threshold=0,
+):
     sentences = []
     for paragraph in paragraphs:
         sentences.extend(split_sentences(paragraph))
@@ -38,12 +136,15 @@ def select_fact_sentences(paragraphs, team_aliases, max_sentences, max_length):
     if not sentences:
         return []
 
-    alias_values = [alias.lower() for alias in team_aliases if alias]
+    if matcher is None:
+        matcher = compile_alias_matcher({"": team_aliases})
 
-    matched = [s for s in sentences if sentence_mentions_team(s, alias_values)]
+    matched = [s for s in sentences if sentence_matches(matcher, s)]
     if not matched:
         matched = sentences
 
+    matched = filter_near_duplicates(matched, dedupe_threshold)
+
     deduped = []
     seen = set()
     for sentence in matched:
@@ -51,9 +152,230 @@ def select_fact_sentences(paragraphs, team_aliases, max_sentences, max_length):
         if normalized not in seen:
             deduped.append(sentence[:max_length])
             seen.add(normalized)
-        if len(deduped) >= max_sentences:
+        if ranking != "ranked" and len(deduped) >= max_sentences:
             break
-    return deduped
+
+    if ranking != "ranked":
+        return [(sentence, None) for sentence in deduped]
+
+    team_counts = [len(match_teams(matcher, sentence)) for sentence in deduped]
+    scores = score_sentences(deduped, team_counts)
+    chosen = select_ranked(deduped, scores, max_sentences, char_budget)
+    return [(deduped[index], round(scores[index], 3)) for index in chosen]
+
+
+def select_fact_sentences(
+    paragraphs,
+    team_aliases,
+    max_sentences,
+    max_length,
+    matcher=None,
+    ranking="first",
+    char_budget=0,
+    dedupe_threshold=0,
+):
+    scored = select_scored_facts(
+        paragraphs,
+        team_aliases,
+        max_sentences,
+        max_length,
+        matcher=matcher,
+        ranking=ranking,
+        char_budget=char_budget,
+        dedupe_threshold=dedupe_threshold,
+    )
+    return [sentence for sentence, _ in scored]
+
+
+def extract_game_facts(
+    recap,
+    max_sentences,
+    max_length,
+    ranking="first",
+    char_budget=0,
+    dedupe_threshold=0,
+):
+    recap_text = recap.get("recap_text") or []
+    if not recap_text:
+        return None, {"game_id": recap.get("game_id"), "error": "missing_recap"}
+
+    scored = select_scored_facts(
+        recap_text,
+        recap.get("team_aliases", []),
+        max_sentences,
+        max_length,
+        matcher=compile_alias_matcher(build_alias_groups(recap)),
+        ranking=ranking,
+        char_budget=char_budget,
+        dedupe_threshold=dedupe_threshold,
+    )
+    if not scored:
+        return None, {"game_id": recap.get("game_id"), "error": "no_facts"}
+
+    fact_game = {
+        "game_id": recap.get("game_id"),
+        "game_date": recap.get("game_date"),
+        "teams": recap.get("teams", []),
+        "team_aliases": recap.get("team_aliases", []),
+        "facts": [sentence for sentence, _ in scored],
+        "source_url": recap.get("source_url"),
+    }
+    if ranking == "ranked":
+        fact_game["fact_scores"] = [score for _, score in scored]
+
+    boxscore_html = recap.get("boxscore_html")
+    if boxscore_html:
+        try:
+            boxscore_facts = build_boxscore_facts(boxscore_html, recap.get("teams", []))
+        except Exception as exc:
+            log_warning(f"Boxscore parse failed for game_id={recap.get('game_id')}: {exc}")
+            boxscore_facts = {}
+        if boxscore_facts:
+            fact_game["boxscore_facts"] = boxscore_facts
+    return fact_game, None
+
+
+def extract_chunk(
+    chunk,
+    max_sentences,
+    max_length,
+    ranking="first",
+    char_budget=0,
+    dedupe_threshold=0,
+):
+    return [
+        extract_game_facts(
+            recap, max_sentences, max_length, ranking, char_budget, dedupe_threshold
+        )
+        for recap in chunk
+    ]
+
+
+def iter_recaps(input_path):
+    if str(input_path).endswith(".jsonl"):
+        with open(input_path, "r", encoding="utf-8") as file_handle:
+            for line in file_handle:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        return
+    recaps_payload = load_json(input_path)
+    yield from recaps_payload.get("games", [])
+
+
+class BoxscoreIndex:
+    # Byte offsets into a .jsonl boxscore archive. Each lookup reads one line,
+    # so memory stays flat however many games the archive holds.
+    def __init__(self, path):
+        self.offsets = {}
+        with open(path, "rb") as file_handle:
+            offset = 0
+            for line in file_handle:
+                if line.strip():
+                    game_id = json.loads(line).get("game_id")
+                    if game_id is not None:
+                        self.offsets[str(game_id)] = offset
+                offset += len(line)
+        self._handle = open(path, "rb")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def get(self, game_id):
+        offset = self.offsets.get(str(game_id))
+        if offset is None:
+            return None
+        self._handle.seek(offset)
+        return json.loads(self._handle.readline())
+
+    def close(self):
+        self._handle.close()
+
+
+def load_boxscores(boxscores_path):
+    if not boxscores_path:
+        return {}
+    try:
+        if str(boxscores_path).endswith(".jsonl"):
+            boxscores = BoxscoreIndex(boxscores_path)
+        else:
+            # Only the html is used; dropping the rest halves what stays loaded.
+            boxscores = {
+                str(game_id): {"html": entry.get("html")}
+                for game_id, entry in load_json(boxscores_path).items()
+                if entry.get("html")
+            }
+    except (OSError, ValueError):
+        log_warning(f"Boxscores not found at {boxscores_path}; skipping boxscore facts.")
+        return {}
+    log_info(f"Loaded {len(boxscores)} boxscores from {boxscores_path}")
+    return boxscores
+
+
+def attach_boxscores(recaps, boxscores):
+    for recap in recaps:
+        entry = boxscores.get(str(recap.get("game_id"))) or {}
+        if entry.get("html"):
+            recap = dict(recap, boxscore_html=entry["html"])
+        yield recap
+
+
+def default_errors_path(output_path):
+    path = Path(output_path)
+    return str(path.with_name(f"{path.name[:-len('.jsonl')]}.errors.jsonl"))
+
+
+def iter_chunks(items, chunk_size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_extracted(
+    recaps,
+    max_sentences,
+    max_length,
+    workers,
+    chunk_size,
+    ranking="first",
+    char_budget=0,
+    dedupe_threshold=0,
+    boxscores=None,
+):
+    settings = (max_sentences, max_length, ranking, char_budget, dedupe_threshold)
+    # Boxscore html is looked up as each chunk is formed, so a worker only
+    # receives the html for the games in its own chunk.
+    chunks = (
+        list(attach_boxscores(chunk, boxscores)) if boxscores else chunk
+        for chunk in iter_chunks(recaps, chunk_size)
+    )
+    if workers <= 1:
+        for chunk in chunks:
+            yield from extract_chunk(chunk, *settings)
+        return
+
+    # Keep a bounded window of chunks in flight and yield them in submission
+    # order so the output is identical to a sequential run.
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(extract_chunk, chunk, *settings))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def resolve_workers(value):
+    workers = int(value)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
 
 
 def main():
@@ -63,57 +385,101 @@ def main():
     output_path = get_env("OUTPUT_PATH", default="/tmp/facts.json")
     max_sentences = int(get_env("MAX_FACT_SENTENCES", default="3"))
     max_length = int(get_env("MAX_FACT_LENGTH", default="300"))
+    workers = resolve_workers(get_env("EXTRACT_WORKERS", default="1"))
+    chunk_size = max(1, int(get_env("EXTRACT_CHUNK_SIZE", default="64")))
+    ranking = get_env("FACT_SELECTION", default="ranked").strip().lower()
+    char_budget = int(get_env("FACT_CHAR_BUDGET", default="600"))
+    dedupe_threshold = float(get_env("FACT_DEDUPE_THRESHOLD", default="0.8"))
+    boxscores_path = get_env("BOX_SCORES_PATH", default="/tmp/boxscores.json")
+    stream_output = str(output_path).endswith(".jsonl")
+    errors_path = get_env(
+        "EXTRACT_ERRORS_PATH",
+        default=default_errors_path(output_path) if stream_output else "",
+    )
 
     log_start("extract_facts", run_id, run_date)
+    log_info(
+        f"Reading recaps from {input_path} (workers={workers} chunk_size={chunk_size} "
+        f"selection={ranking} char_budget={char_budget} "
+        f"dedupe_threshold={dedupe_threshold})"
+    )
 
-    recaps_payload = load_json(input_path)
-    games = recaps_payload.get("games", [])
-    log_info(f"Loaded {len(games)} recaps from {input_path}")
-
+    boxscores = load_boxscores(boxscores_path)
     fact_games = []
     errors = []
+    fact_count = 0
+    store = open_store_from_env()
+    store_batch = []
+    stream_handle = None
+    errors_handle = None
+    if stream_output:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        stream_handle = open(output_path, "w", encoding="utf-8")
+        # Fact rows and error rows have different shapes; keep the fact stream
+        # a single schema.
+        Path(errors_path).parent.mkdir(parents=True, exist_ok=True)
+        errors_handle = open(errors_path, "w", encoding="utf-8")
 
-    for recap in games:
-        recap_text = recap.get("recap_text") or []
-        if not recap_text:
-            errors.append({"game_id": recap.get("game_id"), "error": "missing_recap"})
-            continue
-
-        facts = select_fact_sentences(
-            recap_text,
-            recap.get("team_aliases", []),
+    try:
+        for fact_game, error in iter_extracted(
+            iter_recaps(input_path),
             max_sentences,
             max_length,
-        )
-        if not facts:
-            log_warning(f"No facts extracted for game_id={recap.get('game_id')}")
-            errors.append({"game_id": recap.get("game_id"), "error": "no_facts"})
-            continue
+            workers,
+            chunk_size,
+            ranking=ranking,
+            char_budget=char_budget,
+            dedupe_threshold=dedupe_threshold,
+            boxscores=boxscores,
+        ):
+            if error:
+                if error["error"] == "no_facts":
+                    log_warning(f"No facts extracted for game_id={error['game_id']}")
+                errors.append(error)
+                if errors_handle:
+                    errors_handle.write(json.dumps(error) + "\n")
+                continue
 
-        fact_games.append(
-            {
-                "game_id": recap.get("game_id"),
-                "game_date": recap.get("game_date"),
-                "teams": recap.get("teams", []),
-                "team_aliases": recap.get("team_aliases", []),
-                "facts": facts,
-                "source_url": recap.get("source_url"),
-            }
-        )
+            fact_count += 1
+            if stream_handle:
+                stream_handle.write(json.dumps(fact_game) + "\n")
+            else:
+                fact_games.append(fact_game)
+            if store is not None:
+                store_batch.append(fact_game)
+                if len(store_batch) >= chunk_size:
+                    write_facts(store, run_id, store_batch)
+                    store_batch = []
+    finally:
+        if stream_handle:
+            stream_handle.close()
+        if errors_handle:
+            errors_handle.close()
+        if isinstance(boxscores, BoxscoreIndex):
+            boxscores.close()
 
-    output_payload = {
-        "run_id": run_id,
-        "run_date": run_date,
-        "schema_version": "v1",
-        "source": "recap_fact_extractor",
-        "games": fact_games,
-        "errors": errors,
-    }
-    write_json(output_path, output_payload)
+    log_info(f"Processed {fact_count + len(errors)} recaps from {input_path}")
+
+    if not stream_output:
+        output_payload = {
+            "run_id": run_id,
+            "run_date": run_date,
+            "schema_version": "v1",
+            "source": "recap_fact_extractor",
+            "games": fact_games,
+            "errors": errors,
+        }
+        write_json(output_path, output_payload)
+
+    if store is not None:
+        if store_batch:
+            write_facts(store, run_id, store_batch)
+        store.close()
 
     log_end(
         "extract_facts",
-        f"fact_games={len(fact_games)} errors={len(errors)} output={output_path}",
+        f"fact_games={fact_count} errors={len(errors)} output={output_path}"
+        + (f" errors_output={errors_path}" if stream_output else ""),
     )
 
 
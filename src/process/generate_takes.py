@@ -1,8 +1,8 @@
+import datetime
+import json
 import time
 from collections import Counter
 
-import requests
-
 from src.pipeline.common import (
     build_run_id,
     get_env,
@@ -15,21 +15,48 @@ from src.pipeline.common import (
     resolve_run_date,
     write_json,
 )
-from src.pipeline.http_utils import request_with_retry
+from src.pipeline.boxscore_utils import select_prompt_facts
+from src.pipeline.checkpoint import open_checkpoint_from_env
+from src.pipeline.executor import DeadlineExceeded, RateLimiter, run_jobs
+from src.pipeline.fallback_takes import build_fallback_text
+from src.pipeline.hedging import Hedger
+from src.pipeline.http_utils import log_http_stats, request_with_retry
+from src.pipeline.llm_cache import (
+    log_llm_cache_stats,
+    make_cache_key,
+    open_llm_cache_from_env,
+)
+from src.pipeline.llm_stream import read_stream
+from src.pipeline.llm_telemetry import LLMTelemetry, log_telemetry_summary
+from src.pipeline.model_router import FAILOVER_STATUSES, ModelRouter
+from src.pipeline.preferences import load_preference_rows
 from src.pipeline.prompt_utils import (
+    build_batch_user_prompt,
     build_system_prompt,
     build_user_prompt,
+    compact_prompt_args,
     load_prompt_assets,
     load_prompt_version,
 )
-from src.pipeline.style_utils import normalize_style, style_label
+from src.pipeline.store import (
+    open_store_from_env,
+    prune_takes,
+    query_takes,
+    write_takes,
+)
+from src.pipeline.style_utils import normalize_style, pick_style, style_label
+from src.pipeline.supabase_utils import open_supabase_reader_from_env
 from src.pipeline.team_utils import matches_team
+from src.pipeline.token_utils import estimate_message_tokens
+from src.pipeline.user_utils import build_demand, parse_run_date
 
 
 API_URL_DEFAULT = "https://openrouter.ai/api/v1/chat/completions"
 MODEL_DEFAULT = "arcee-ai/trinity-large-preview:free"
 
 STYLE_KEYS = ["factual", "hot_takes", "analytical", "nuanced", "mix"]
+BATCH_MODES = ("off", "styles", "game")
+BATCH_TOKEN_OVERHEAD = 60
 
 
 def call_llm(
@@ -41,6 +68,9 @@ def call_llm(
     max_tokens,
     referer,
     title,
+    timeout=30,
+    max_retries=2,
+    stream=False,
 ):
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -56,29 +86,629 @@ def call_llm(
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
+    if stream:
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
     response = request_with_retry(
         "POST",
         api_url,
         headers=headers,
         json=payload,
-        timeout=30,
-        max_retries=2,
+        timeout=timeout,
+        max_retries=max_retries,
         retry_statuses={429},
         backoff_type="fixed",
         base_delay=5,
+        stream=stream,
     )
     return response
 
 
-def fetch_supabase_rows(base_url, api_key, table, query):
-    url = f"{base_url}/rest/v1/{table}?{query}"
-    headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}"}
-    response = requests.get(url, headers=headers, timeout=20)
+def build_budgeted_messages(prompt_settings, render_prompt, prompt_args, fact_scores=None):
+    def render(args):
+        return [
+            {"role": "system", "content": prompt_settings["system_prompt"]},
+            {"role": "user", "content": render_prompt(**args)},
+        ]
+
+    compacted, prompt_tokens, compaction = compact_prompt_args(
+        prompt_args,
+        prompt_settings["max_prompt_tokens"],
+        lambda args: estimate_message_tokens(render(args), prompt_settings["model"]),
+        fact_scores=fact_scores,
+    )
+    return render(compacted), prompt_tokens, compaction
+
+
+def build_take_jobs(games, team_style_map, styles, prompt_settings, boxscores_payload):
+    jobs = []
+    errors = []
+    considered_games = 0
+    skipped_games = 0
+    max_boxscore_chars = prompt_settings["max_boxscore_chars"]
+
+    for game in games:
+        facts = game.get("facts") or []
+        if not facts:
+            errors.append({"game_id": game.get("game_id"), "error": "missing_facts"})
+            continue
+
+        game_id = str(game.get("game_id"))
+        game_aliases = game.get("team_aliases") or game.get("teams") or []
+        focus_teams = []
+        for team_name in team_style_map:
+            if matches_team(team_name, game_aliases):
+                focus_teams.append(team_name)
+
+        if not focus_teams:
+            skipped_games += 1
+            continue
+
+        considered_games += 1
+        boxscore_entry = boxscores_payload.get(game_id, {})
+        raw_boxscore_text = (boxscore_entry.get("text") or "").strip()
+        if raw_boxscore_text and max_boxscore_chars > 0:
+            boxscore_text = raw_boxscore_text[:max_boxscore_chars]
+        else:
+            boxscore_text = ""
+
+        for focus_team in focus_teams:
+            required_styles = team_style_map.get(focus_team, set())
+            if prompt_settings["boxscore_mode"] == "facts":
+                boxscore_facts = select_prompt_facts(game.get("boxscore_facts"), focus_team)
+            else:
+                boxscore_facts = []
+            for style_key in STYLE_KEYS:
+                if style_key not in required_styles:
+                    continue
+                style_text = styles.get(style_key)
+                if not style_text:
+                    log_warning(f"Missing style prompt for {style_key}")
+                    continue
+
+                prompt_args = {
+                    "teams": game.get("teams", []),
+                    "facts": facts,
+                    "style": style_label(style_key),
+                    "style_guidance": style_text,
+                    "max_words": prompt_settings["max_words"],
+                    "audience": prompt_settings["audience"],
+                    "disclaimer": prompt_settings["disclaimer"],
+                    "focus_team": focus_team,
+                    "boxscore_text": boxscore_text,
+                    "boxscore_facts": boxscore_facts,
+                }
+                messages, prompt_tokens, compaction = build_budgeted_messages(
+                    prompt_settings, build_user_prompt, prompt_args, game.get("fact_scores")
+                )
+                jobs.append(
+                    {
+                        "game": game,
+                        "focus_team": focus_team,
+                        "style_key": style_key,
+                        "prompt_args": prompt_args,
+                        "messages": messages,
+                        "prompt_tokens": prompt_tokens,
+                        "compaction": compaction,
+                    }
+                )
+
+    return jobs, errors, considered_games, skipped_games
+
+
+def merge_boxscore_facts(slots):
+    merged = []
+    for slot in slots:
+        for fact in slot["prompt_args"]["boxscore_facts"] or []:
+            if fact not in merged:
+                merged.append(fact)
+    return merged
+
+
+def build_batch_jobs(jobs, prompt_settings, max_tokens, batch_mode):
+    groups = {}
+    for job in jobs:
+        key = str(job["game"].get("game_id"))
+        if batch_mode == "styles":
+            key = (key, job["focus_team"])
+        groups.setdefault(key, []).append(job)
+
+    batch_jobs = []
+    for slots in groups.values():
+        if len(slots) == 1:
+            batch_jobs.append(slots[0])
+            continue
+        prompt_args = slots[0]["prompt_args"]
+        style_guides = {}
+        for slot in slots:
+            style_guides.setdefault(
+                slot["style_key"],
+                (
+                    slot["style_key"],
+                    slot["prompt_args"]["style"],
+                    slot["prompt_args"]["style_guidance"],
+                ),
+            )
+        batch_args = {
+            "teams": prompt_args["teams"],
+            "facts": prompt_args["facts"],
+            "slots": [(slot["focus_team"], slot["style_key"]) for slot in slots],
+            "style_guides": list(style_guides.values()),
+            "max_words": prompt_args["max_words"],
+            "audience": prompt_args["audience"],
+            "disclaimer": prompt_args["disclaimer"],
+            "boxscore_text": prompt_args["boxscore_text"],
+            "boxscore_facts": merge_boxscore_facts(slots),
+        }
+        messages, prompt_tokens, compaction = build_budgeted_messages(
+            prompt_settings,
+            build_batch_user_prompt,
+            batch_args,
+            slots[0]["game"].get("fact_scores"),
+        )
+        batch_jobs.append(
+            {
+                "game": slots[0]["game"],
+                "slots": slots,
+                "max_tokens": max_tokens * len(slots) + BATCH_TOKEN_OVERHEAD,
+                "messages": messages,
+                "prompt_tokens": prompt_tokens,
+                "compaction": compaction,
+            }
+        )
+    return batch_jobs
+
+
+def parse_batch_takes(content, slots):
+    start = content.find("{")
+    end = content.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        data = json.loads(content[start : end + 1])
+    except ValueError:
+        return {}
+    entries = data.get("takes") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return {}
+
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        take_text = entry.get("take")
+        if not isinstance(take_text, str) or not take_text.strip():
+            continue
+        style_key = normalize_style(str(entry.get("style") or ""))
+        focus_team = str(entry.get("focus_team") or "")
+        for index, slot in enumerate(slots):
+            if index in parsed or slot["style_key"] != style_key:
+                continue
+            if focus_team == slot["focus_team"] or matches_team(
+                focus_team, [slot["focus_team"]]
+            ):
+                parsed[index] = take_text.strip()
+                break
+    return parsed
+
+
+def job_slots(job):
+    if "slots" in job:
+        return [(slot["focus_team"], slot["style_key"]) for slot in job["slots"]]
+    return [(job["focus_team"], job["style_key"])]
+
+
+def response_usage(response):
     if response.status_code != 200:
-        raise RuntimeError(
-            f"Supabase request failed: {response.status_code} {response.text}"
+        return {}
+    stream_result = getattr(response, "stream_result", None)
+    if stream_result is not None:
+        return stream_result["usage"]
+    try:
+        return response.json().get("usage") or {}
+    except ValueError:
+        return {}
+
+
+def describe_job(job):
+    if "slots" in job:
+        return f"slots={len(job['slots'])}"
+    return f"style={job['style_key']}"
+
+
+def job_error(job, error):
+    return {
+        "game_id": job["game"].get("game_id"),
+        "style": job.get("style_key", "batch"),
+        "error": error,
+    }
+
+
+def request_completion(job, llm_settings):
+    import requests
+
+    game = job["game"]
+    router = llm_settings["router"]
+    hedger = llm_settings.get("hedger")
+    telemetry = llm_settings["telemetry"]
+    candidates = router.candidates()
+    # Batched replies are JSON, so only single takes can be cut off early.
+    streaming = llm_settings["stream"] and "slots" not in job
+    for position, model in enumerate(candidates):
+        last_candidate = position == len(candidates) - 1
+        started = time.monotonic()
+
+        def send(attempt=None, model=model, last_candidate=last_candidate):
+            # Every HTTP call is recorded here, hedge duplicates included, so
+            # telemetry shows what the hedger really spent.
+            call_started = time.monotonic()
+            hedge = attempt is not None and attempt.hedge
+            try:
+                response = call_llm(
+                    api_url=llm_settings["api_url"],
+                    api_key=llm_settings["api_key"],
+                    model=model,
+                    messages=job["messages"],
+                    temperature=llm_settings["temperature"],
+                    max_tokens=job.get("max_tokens", llm_settings["max_tokens"]),
+                    referer=llm_settings["referer"],
+                    title=llm_settings["title"],
+                    max_retries=2 if last_candidate else 0,
+                    stream=streaming,
+                )
+            except requests.RequestException as exc:
+                telemetry.record_call(
+                    game_id=game.get("game_id"),
+                    slots=job_slots(job),
+                    model=model,
+                    latency_ms=(time.monotonic() - call_started) * 1000,
+                    error=type(exc).__name__,
+                    estimated_prompt_tokens=job["prompt_tokens"],
+                    hedge=hedge,
+                )
+                raise
+            if streaming and response.status_code == 200:
+                if attempt is not None:
+                    attempt.attach(response)
+                # Read inside the call so hedging races whole completions.
+                response.stream_result = read_stream(
+                    response,
+                    model,
+                    llm_settings["max_words"],
+                    llm_settings["stream_slack_words"],
+                    cancelled=attempt.is_cancelled if attempt is not None else None,
+                )
+            telemetry.record_call(
+                game_id=game.get("game_id"),
+                slots=job_slots(job),
+                model=model,
+                latency_ms=(time.monotonic() - call_started) * 1000,
+                status=response.status_code,
+                response=response,
+                usage=response_usage(response),
+                estimated_prompt_tokens=job["prompt_tokens"],
+                stop_reason=getattr(response, "stream_result", {}).get("stop_reason"),
+                hedge=hedge,
+            )
+            return response
+
+        try:
+            if hedger is None:
+                response = send()
+            else:
+                response = hedger.run(
+                    model, send, lambda response: response.status_code == 200
+                )
+        except requests.RequestException as exc:
+            router.record_failure(model, type(exc).__name__)
+            if last_candidate:
+                raise
+            router.record_failover(model)
+            log_warning(
+                f"LLM {model} failed for game_id={game.get('game_id')} "
+                f"({type(exc).__name__}); trying next model"
+            )
+            continue
+
+        latency_ms = (time.monotonic() - started) * 1000
+        if response.status_code in FAILOVER_STATUSES:
+            router.record_failure(
+                model,
+                f"http_{response.status_code}",
+                retry_after=response.headers.get("Retry-After"),
+            )
+            if not last_candidate:
+                router.record_failover(model)
+                log_warning(
+                    f"LLM {model} returned {response.status_code} for "
+                    f"game_id={game.get('game_id')}; trying next model"
+                )
+                continue
+        elif response.status_code == 200:
+            router.record_success(model, latency_ms)
+        break
+
+    if response.status_code != 200:
+        response_detail = response.text.strip().replace("\n", " ")
+        if len(response_detail) > 300:
+            response_detail = response_detail[:300] + "..."
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            log_warning(
+                f"LLM Retry-After for game_id={game.get('game_id')}: {retry_after}"
+            )
+        log_error(
+            f"LLM error for game_id={game.get('game_id')} {describe_job(job)}: "
+            f"{response.status_code} {response_detail}"
+        )
+        return None, model, {
+            "failed": True,
+            "error": job_error(job, f"http_{response.status_code}"),
+        }
+
+    stream_result = getattr(response, "stream_result", None)
+    if stream_result is not None:
+        if stream_result["error"]:
+            log_error(f"LLM stream error: {stream_result['error']}")
+            return None, model, {
+                "failed": True,
+                "error": job_error(job, stream_result["error"]),
+            }
+        return stream_result["content"], model, None
+
+    data = response.json()
+    if "error" in data:
+        error_message = data.get("error", {}).get("message", "unknown_error")
+        log_error(f"LLM response error: {error_message}")
+        return None, model, {"failed": True, "error": job_error(job, error_message)}
+
+    choices = data.get("choices") or []
+    if not choices:
+        log_error(
+            f"No LLM choices for game_id={game.get('game_id')} {describe_job(job)}"
+        )
+        return None, model, {"failed": True, "error": job_error(job, "no_choices")}
+
+    content = choices[0].get("message", {}).get("content", "").strip()
+    return content, model, None
+
+
+def build_take_result(job, content, model, prompt_tokens=None):
+    game = job["game"]
+    normalized = content.upper()
+    if (
+        not content
+        or normalized.startswith("INSUFFIC")
+        or "INSUFFICIENT FACTS" in normalized
+    ):
+        return {"failed": False, "error": job_error(job, "insufficient_facts")}
+
+    return {
+        "failed": False,
+        "take": {
+            "game_id": game.get("game_id"),
+            "game_date": game.get("game_date"),
+            "teams": game.get("teams", []),
+            "team_aliases": game.get("team_aliases", []),
+            "focus_team": job["focus_team"],
+            "style": normalize_style(job["style_key"]),
+            "take_text": content,
+            "model": model,
+            "estimated_prompt_tokens": (
+                job["prompt_tokens"] if prompt_tokens is None else prompt_tokens
+            ),
+        },
+    }
+
+
+def fetch_completion(job, llm_settings, cache=None):
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(
+            llm_settings["model"],
+            job["messages"],
+            llm_settings["temperature"],
+            job.get("max_tokens", llm_settings["max_tokens"]),
+            llm_settings["prompt_version"],
         )
-    return response.json()
+        cached = cache.get(cache_key)
+        if cached is not None:
+            llm_settings["telemetry"].record_cache_hit()
+            content, model = cached
+            return content, model, None
+
+    content, model, failure = request_completion(job, llm_settings)
+    if failure is None and cache is not None:
+        cache.put(cache_key, model, content)
+    return content, model, failure
+
+
+def run_take_job(job, llm_settings, cache=None):
+    content, model, failure = fetch_completion(job, llm_settings, cache)
+    if failure:
+        return failure
+    return build_take_result(job, content, model)
+
+
+def run_batch_job(job, llm_settings, cache=None):
+    content, model, failure = fetch_completion(job, llm_settings, cache)
+    if failure:
+        return {"failed": True, "error": failure["error"], "results": {}}
+    parsed = parse_batch_takes(content, job["slots"])
+    if len(parsed) < len(job["slots"]):
+        log_warning(
+            f"Batched LLM response for game_id={job['game'].get('game_id')} "
+            f"parsed {len(parsed)}/{len(job['slots'])} slots; falling back per style"
+        )
+    prompt_tokens = round(job["prompt_tokens"] / len(job["slots"]))
+    return {
+        "failed": False,
+        "results": {
+            index: build_take_result(job["slots"][index], take_text, model, prompt_tokens)
+            for index, take_text in parsed.items()
+        },
+    }
+
+
+def job_key(job):
+    return (str(job["game"].get("game_id")), job["focus_team"], job["style_key"])
+
+
+def checkpoint_result(checkpoint, job, result):
+    # Runs in the worker thread so each completion is durable before the
+    # next one starts; failed slots are recorded but retried on resume.
+    if checkpoint is None:
+        return result
+    if "slots" in job:
+        slot_results = result.get("results", {}).items()
+    else:
+        slot_results = [(None, result)]
+    for index, slot_result in slot_results:
+        slot = job if index is None else job["slots"][index]
+        checkpoint.append(
+            job_key(slot),
+            done=not slot_result["failed"],
+            take=slot_result.get("take"),
+            error=slot_result.get("error"),
+        )
+    return result
+
+
+def load_checkpoint_results(checkpoint, jobs):
+    if checkpoint is None:
+        return {}
+    completed = checkpoint.completed()
+    results = {}
+    for job in jobs:
+        record = completed.get(job_key(job))
+        if record is not None:
+            results[id(job)] = {"failed": False, "take": record["take"], "error": record["error"]}
+    return results
+
+
+def split_mix_jobs(jobs):
+    # Mix takes can be composed locally whenever another style is being
+    # generated for the same game and focus team.
+    styled = {
+        (str(job["game"].get("game_id")), job["focus_team"])
+        for job in jobs
+        if job["style_key"] != "mix"
+    }
+    return [
+        job
+        for job in jobs
+        if job["style_key"] == "mix"
+        and (str(job["game"].get("game_id")), job["focus_team"]) in styled
+    ]
+
+
+def compose_mix_result(job, jobs, job_results, run_id):
+    game_id = str(job["game"].get("game_id"))
+    sources = {}
+    siblings_skipped = []
+    for other in jobs:
+        if other is job or other["style_key"] == "mix":
+            continue
+        if str(other["game"].get("game_id")) != game_id:
+            continue
+        if other["focus_team"] != job["focus_team"]:
+            continue
+        result = job_results.get(id(other), {})
+        siblings_skipped.append(bool(result.get("skipped")))
+        take = result.get("take")
+        if take and not take.get("fallback"):
+            sources[other["style_key"]] = take
+    if not sources:
+        if siblings_skipped and all(siblings_skipped):
+            return unwrap_result(job, DeadlineExceeded())
+        return {"failed": False, "error": job_error(job, "mix_source_missing")}
+
+    source_style = pick_style(
+        [style_key for style_key in STYLE_KEYS if style_key in sources],
+        run_id,
+        game_id,
+        job["focus_team"],
+    )
+    take = dict(sources[source_style])
+    take["style"] = "mix"
+    take["mix_source_style"] = source_style
+    take["estimated_prompt_tokens"] = 0
+    return {"failed": False, "take": take}
+
+
+def build_fallback_result(job, result, max_words):
+    # Only fill slots the LLM could not answer; a model that judged the facts
+    # insufficient is respected.
+    error = result.get("error") or {}
+    if error.get("error") == "insufficient_facts":
+        return None
+    take_text = build_fallback_text(job["game"], job["focus_team"], job["style_key"], max_words)
+    if not take_text:
+        return None
+    fallback = build_take_result(job, take_text, "template", prompt_tokens=0)
+    fallback["take"]["fallback"] = True
+    fallback["error"] = result.get("error")
+    return fallback
+
+
+def job_recipients(job):
+    if "slots" in job:
+        return sum(slot["recipients"] for slot in job["slots"])
+    return job["recipients"]
+
+
+def build_archive_demand(store, skipped_demand, since):
+    # Pairs held back only by weekly frequency are not emailed tonight, so
+    # they are generated just while the archive has nothing for them inside
+    # the digest's lookback window.
+    archive_demand = {}
+    for (team, style_key), reasons in skipped_demand.items():
+        if not reasons.get("frequency"):
+            continue
+        if query_takes(store, team=team, style=style_key, date_from=since, limit=1):
+            continue
+        archive_demand[(team, style_key)] = reasons["frequency"]
+    return archive_demand
+
+
+def prioritize_jobs(jobs):
+    # Most recipients first; ties go to the most recent game.
+    ordered = sorted(jobs, key=lambda job: job["game"].get("game_date") or "", reverse=True)
+    return sorted(ordered, key=job_recipients, reverse=True)
+
+
+def unwrap_result(job, result):
+    if isinstance(result, DeadlineExceeded):
+        return {"failed": False, "skipped": True, "error": job_error(job, "deadline_exceeded")}
+    if isinstance(result, Exception):
+        log_error(
+            f"LLM request failed for game_id={job['game'].get('game_id')} "
+            f"{describe_job(job)}: {result}"
+        )
+        return {"failed": True, "error": job_error(job, "request_failed")}
+    return result
+
+
+def run_llm_job(job, llm_settings, cache=None):
+    if "slots" in job:
+        return run_batch_job(job, llm_settings, cache)
+    return run_take_job(job, llm_settings, cache)
+
+
+def log_prompt_budget(llm_jobs, max_prompt_tokens):
+    if not llm_jobs:
+        return
+    prompt_tokens = [job["prompt_tokens"] for job in llm_jobs]
+    compaction = Counter(step for job in llm_jobs for step in job["compaction"])
+    compacted = sum(1 for job in llm_jobs if job["compaction"])
+    over_budget = sum(
+        1 for tokens in prompt_tokens if max_prompt_tokens and tokens > max_prompt_tokens
+    )
+    log_info(
+        f"Estimated prompt tokens: total={sum(prompt_tokens)} "
+        f"max={max(prompt_tokens)} budget={max_prompt_tokens} compacted={compacted} "
+        f"steps={dict(compaction)} over_budget={over_budget}"
+    )
 
 
 def main():
@@ -86,9 +716,16 @@ def main():
     run_date = resolve_run_date()
     input_path = get_env("FACTS_PATH", default="/tmp/facts.json")
     output_path = get_env("OUTPUT_PATH", default="/tmp/takes.json")
+    telemetry_path = get_env("LLM_TELEMETRY_PATH", default="/tmp/llm_telemetry.json")
     boxscores_path = get_env("BOX_SCORES_PATH", default="/tmp/boxscores.json")
     api_url = get_env("OPEN_ROUTER_API_URL", default=API_URL_DEFAULT)
     model = get_env("OPEN_ROUTER_MODEL", default=MODEL_DEFAULT)
+    models = [
+        name.strip()
+        for name in get_env("OPEN_ROUTER_MODELS", default=model).split(",")
+        if name.strip()
+    ]
+    model = models[0]
     api_key = get_env("OPEN_ROUTER_KEY", required=True)
     referer = get_env(
         "OPEN_ROUTER_REFERER",
@@ -99,10 +736,14 @@ def main():
     supabase_key = get_env("SUPABASE_KEY", required=True)
     users_table = get_env("SUPABASE_USERS_TABLE", default="users")
     interests_table = get_env("SUPABASE_INTERESTS_TABLE", default="interests")
-    users_query = get_env("SUPABASE_USERS_QUERY", default="select=id,take_style")
+    users_query = get_env(
+        "SUPABASE_USERS_QUERY", default="select=id,email,frequency,take_style"
+    )
     interests_query = get_env(
         "SUPABASE_INTERESTS_QUERY", default="select=user_id,team"
     )
+    preferences_path = get_env("PREFERENCES_SNAPSHOT_PATH", default="")
+    weekly_send_day = get_env("WEEKLY_SEND_DAY", default="monday").strip().lower()
     max_words = int(get_env("MAX_TAKE_WORDS", default="120"))
     max_tokens = int(get_env("MAX_TAKE_TOKENS", default="220"))
     temperature = float(get_env("TAKE_TEMPERATURE", default="0.6"))
@@ -110,8 +751,40 @@ def main():
     disclaimer = get_env("TAKE_DISCLAIMER", default="Based on ESPN recap text.")
     failure_threshold = float(get_env("FAILURE_ALERT_THRESHOLD", default="0.5"))
     pause_seconds = float(get_env("LLM_REQUEST_DELAY_SECONDS", default="0"))
+    max_per_minute = int(get_env("LLM_MAX_REQUESTS_PER_MINUTE", default="0"))
+    concurrency = max(1, int(get_env("LLM_CONCURRENCY", default="4")))
     max_boxscore_chars = int(get_env("MAX_BOXSCORE_CHARS", default="1200"))
+    boxscore_mode = get_env("BOXSCORE_PROMPT_MODE", default="facts").strip().lower()
+    router_window = int(get_env("LLM_ROUTER_WINDOW", default="20"))
+    cooldown_seconds = float(get_env("LLM_MODEL_COOLDOWN_SECONDS", default="60"))
+    mix_from_styles = get_env("MIX_FROM_STYLES", default="0").strip().lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    fallback_enabled = get_env("FALLBACK_TAKES", default="1").strip().lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    deadline_seconds = float(get_env("GENERATE_DEADLINE_SECONDS", default="0"))
+    hedge_percentile = float(get_env("LLM_HEDGE_PERCENTILE", default="0"))
+    hedge_max_fraction = float(get_env("LLM_HEDGE_MAX_FRACTION", default="0.1"))
+    hedge_min_samples = int(get_env("LLM_HEDGE_MIN_SAMPLES", default="10"))
+    max_prompt_tokens = int(get_env("MAX_PROMPT_TOKENS", default="1500"))
+    stream_enabled = get_env("LLM_STREAM", default="0").strip().lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    stream_slack_words = int(get_env("LLM_STREAM_SLACK_WORDS", default="15"))
+    archive_days = int(get_env("TAKES_ARCHIVE_DAYS", default="28"))
+    weekly_lookback_days = int(get_env("WEEKLY_LOOKBACK_DAYS", default="7"))
+    batch_mode = get_env("TAKE_BATCH_MODE", default="game").strip().lower()
+    if batch_mode not in BATCH_MODES:
+        raise ValueError(f"TAKE_BATCH_MODE must be one of {', '.join(BATCH_MODES)}")
 
+    stage_started = time.monotonic()
     log_start("generate_takes", run_id, run_date)
 
     prompt_version = load_prompt_version()
@@ -128,34 +801,57 @@ def main():
         boxscores_payload = {}
         log_warning(f"Boxscores not found at {boxscores_path}; continuing without.")
 
-    users = fetch_supabase_rows(
-        supabase_url, supabase_key, users_table, users_query
-    )
-    interests = fetch_supabase_rows(
-        supabase_url, supabase_key, interests_table, interests_query
-    )
-    log_info(f"Loaded {len(users)} users and {len(interests)} interests")
-
-    user_styles = {}
-    for user in users:
-        user_id = user.get("id")
-        if user_id is None:
-            continue
-        style_key = normalize_style(user.get("take_style") or "mix")
-        if style_key not in STYLE_KEYS:
-            continue
-        user_styles[str(user_id)] = style_key
+    preferences = load_preference_rows(preferences_path) if preferences_path else None
+    if preferences is not None:
+        users, interests = preferences
+    else:
+        supabase = open_supabase_reader_from_env(supabase_url, supabase_key)
+        users = list(supabase.iter_rows(users_table, users_query))
+        # Interests are the larger table; build_demand folds them as they
+        # stream in.
+        interests = supabase.iter_rows(interests_table, interests_query)
 
+    demand, skipped_demand = build_demand(
+        users,
+        interests,
+        parse_run_date(run_date),
+        weekly_send_day,
+        style_keys=STYLE_KEYS,
+    )
+    store = open_store_from_env()
+    archive_demand = {}
+    if store is not None and archive_days > 0:
+        weekly_since = (
+            parse_run_date(run_date) - datetime.timedelta(days=weekly_lookback_days)
+        ).isoformat()
+        archive_demand = build_archive_demand(store, skipped_demand, weekly_since)
+        if archive_demand:
+            log_info(
+                f"Generating {len(archive_demand)} weekly-only team/style pairs "
+                f"for the takes archive (no archived take since {weekly_since})"
+            )
     team_style_map = {}
-    for interest in interests:
-        user_id = interest.get("user_id")
-        team = interest.get("team")
-        if user_id is None or not team:
-            continue
-        style_key = user_styles.get(str(user_id))
-        if not style_key:
-            continue
+    for team, style_key in list(demand) + list(archive_demand):
         team_style_map.setdefault(team, set()).add(style_key)
+    for (team, style_key), reasons in sorted(skipped_demand.items()):
+        log_info(
+            f"Skipping team={team} style={style_key}: no eligible recipients "
+            f"({', '.join(f'{reason}={count}' for reason, count in reasons.most_common())})"
+        )
+    demand_summary = {
+        "pairs": [
+            {"team": team, "style": style_key, "recipients": recipients}
+            for (team, style_key), recipients in sorted(demand.items())
+        ],
+        "skipped_pairs": [
+            {"team": team, "style": style_key, "reasons": dict(reasons)}
+            for (team, style_key), reasons in sorted(skipped_demand.items())
+        ],
+        "archive_pairs": [
+            {"team": team, "style": style_key, "subscribers": subscribers}
+            for (team, style_key), subscribers in sorted(archive_demand.items())
+        ],
+    }
 
     if not team_style_map:
         log_warning("No team/style preferences found; skipping take generation.")
@@ -166,177 +862,192 @@ def main():
             "source": "openrouter",
             "prompt_version": prompt_version,
             "model": model,
+            "models": {},
+            "demand": demand_summary,
             "takes": [],
             "errors": [],
         }
         write_json(output_path, output_payload)
+        if store is not None:
+            store.close()
+        log_http_stats()
         log_end("generate_takes", "takes=0 errors=0 output=%s" % output_path)
         return
 
-    style_counts = Counter(user_styles.values())
-    log_info(f"User take style counts: {dict(style_counts)}")
-    log_info(f"Unique teams requested: {len(team_style_map)}")
-
-    takes = []
-    errors = []
-    total_requests = 0
-    failed_requests = 0
-    considered_games = 0
-    skipped_games = 0
-
-    for game in games:
-        facts = game.get("facts") or []
-        if not facts:
-            errors.append({"game_id": game.get("game_id"), "error": "missing_facts"})
-            continue
-
-        game_id = str(game.get("game_id"))
-        game_aliases = game.get("team_aliases") or game.get("teams") or []
-        focus_teams = []
-        for team_name in team_style_map:
-            if matches_team(team_name, game_aliases):
-                focus_teams.append(team_name)
-
-        if not focus_teams:
-            skipped_games += 1
-            continue
-
-        considered_games += 1
-        boxscore_entry = boxscores_payload.get(game_id, {})
-        raw_boxscore_text = (boxscore_entry.get("text") or "").strip()
-        if raw_boxscore_text and max_boxscore_chars > 0:
-            boxscore_text = raw_boxscore_text[:max_boxscore_chars]
-        else:
-            boxscore_text = ""
+    style_counts = Counter()
+    for (_, style_key), recipients in demand.items():
+        style_counts[style_key] += recipients
+    log_info(f"Recipient take style counts: {dict(style_counts)}")
+    log_info(
+        f"Unique teams requested: {len(team_style_map)} "
+        f"(team/style pairs={len(demand)} skipped={len(skipped_demand)})"
+    )
 
-        for focus_team in focus_teams:
-            required_styles = team_style_map.get(focus_team, set())
-            for style_key in STYLE_KEYS:
-                if style_key not in required_styles:
-                    continue
-                style_text = styles.get(style_key)
-                if not style_text:
-                    log_warning(f"Missing style prompt for {style_key}")
-                    continue
+    prompt_settings = {
+        "system_prompt": system_prompt,
+        "max_words": max_words,
+        "audience": audience,
+        "disclaimer": disclaimer,
+        "max_boxscore_chars": max_boxscore_chars,
+        "boxscore_mode": boxscore_mode,
+        "model": model,
+        "max_prompt_tokens": max_prompt_tokens,
+    }
+    llm_settings = {
+        "api_url": api_url,
+        "api_key": api_key,
+        "model": ",".join(models),
+        "router": ModelRouter(
+            models, window=router_window, cooldown_seconds=cooldown_seconds
+        ),
+        "telemetry": LLMTelemetry(),
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "referer": referer,
+        "title": title,
+        "prompt_version": prompt_version,
+        "stream": stream_enabled,
+        "max_words": max_words,
+        "stream_slack_words": stream_slack_words,
+    }
 
-                user_prompt = build_user_prompt(
-                    teams=game.get("teams", []),
-                    facts=facts,
-                    style=style_label(style_key),
-                    style_guidance=style_text,
-                    max_words=max_words,
-                    audience=audience,
-                    disclaimer=disclaimer,
-                    focus_team=focus_team,
-                    boxscore_text=boxscore_text,
-                )
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
+    jobs, errors, considered_games, skipped_games = build_take_jobs(
+        games, team_style_map, styles, prompt_settings, boxscores_payload
+    )
+    for job in jobs:
+        job["recipients"] = demand.get((job["focus_team"], job["style_key"]), 0)
+    checkpoint = open_checkpoint_from_env(run_id)
+    job_results = load_checkpoint_results(checkpoint, jobs)
+    if job_results:
+        log_info(
+            f"Resuming run_id={run_id}: {len(job_results)} of {len(jobs)} takes "
+            "already completed"
+        )
+    mix_jobs = split_mix_jobs(jobs) if mix_from_styles else []
+    mix_job_ids = {id(job) for job in mix_jobs}
+    source_jobs = [
+        job for job in jobs if id(job) not in mix_job_ids and id(job) not in job_results
+    ]
+    if mix_jobs:
+        log_info(f"Composing {len(mix_jobs)} mix takes from other generated styles")
+    if batch_mode == "off":
+        llm_jobs = source_jobs
+    else:
+        llm_jobs = build_batch_jobs(source_jobs, prompt_settings, max_tokens, batch_mode)
+    llm_jobs = prioritize_jobs(llm_jobs)
+    deadline = stage_started + deadline_seconds if deadline_seconds > 0 else None
+    log_info(
+        f"Submitting {len(llm_jobs)} LLM requests for {len(jobs)} takes "
+        f"(batch_mode={batch_mode} concurrency={concurrency})"
+    )
 
-                total_requests += 1
-                response = call_llm(
-                    api_url=api_url,
-                    api_key=api_key,
-                    model=model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    referer=referer,
-                    title=title,
-                )
+    rate_limiter = RateLimiter(min_interval=pause_seconds, max_per_minute=max_per_minute)
+    cache = open_llm_cache_from_env()
+    if hedge_percentile > 0:
+        llm_settings["hedger"] = Hedger(
+            hedge_percentile,
+            hedge_max_fraction,
+            min_samples=hedge_min_samples,
+            max_workers=concurrency * 2,
+        )
 
-                if response.status_code != 200:
-                    failed_requests += 1
-                    response_detail = response.text.strip().replace("\n", " ")
-                    if len(response_detail) > 300:
-                        response_detail = response_detail[:300] + "..."
-                    retry_after = response.headers.get("Retry-After")
-                    if retry_after:
-                        log_warning(
-                            f"LLM Retry-After for game_id={game.get('game_id')}: {retry_after}"
-                        )
-                    log_error(
-                        f"LLM error for game_id={game.get('game_id')} style={style_key}: "
-                        f"{response.status_code} {response_detail}"
-                    )
-                    errors.append(
-                        {
-                            "game_id": game.get("game_id"),
-                            "style": style_key,
-                            "error": f"http_{response.status_code}",
-                        }
-                    )
-                    if pause_seconds > 0:
-                        time.sleep(pause_seconds)
-                    continue
+    def run_phase(phase_jobs):
+        return run_jobs(
+            phase_jobs,
+            lambda job: checkpoint_result(
+                checkpoint, job, run_llm_job(job, llm_settings, cache=cache)
+            ),
+            concurrency=concurrency,
+            rate_limiter=rate_limiter,
+            deadline=deadline,
+        )
 
-                data = response.json()
-                if "error" in data:
-                    failed_requests += 1
-                    error_message = data.get("error", {}).get("message", "unknown_error")
-                    log_error(f"LLM response error: {error_message}")
-                    errors.append(
-                        {
-                            "game_id": game.get("game_id"),
-                            "style": style_key,
-                            "error": error_message,
-                        }
-                    )
-                    if pause_seconds > 0:
-                        time.sleep(pause_seconds)
-                    continue
+    started = time.monotonic()
+    fallback_jobs = []
+    total_requests = len(llm_jobs)
+    failed_requests = 0
+    skipped_requests = 0
+    for llm_job, result in zip(llm_jobs, run_phase(llm_jobs)):
+        result = unwrap_result(llm_job, result)
+        failed_requests += int(result["failed"])
+        if result.get("skipped"):
+            skipped_requests += 1
+        if "slots" not in llm_job:
+            job_results[id(llm_job)] = result
+            continue
+        for index, slot in enumerate(llm_job["slots"]):
+            if index in result.get("results", {}):
+                job_results[id(slot)] = result["results"][index]
+            elif result.get("skipped"):
+                job_results[id(slot)] = unwrap_result(slot, DeadlineExceeded())
+            elif result["failed"]:
+                # The batch already went through every routed model, so
+                # per-style retries would only add load to a failing
+                # provider; template fallbacks and resume cover these slots.
+                job_results[id(slot)] = {
+                    "failed": True,
+                    "error": job_error(slot, result["error"]["error"]),
+                }
+            else:
+                fallback_jobs.append(slot)
 
-                choices = data.get("choices") or []
-                if not choices:
-                    failed_requests += 1
-                    log_error(
-                        f"No LLM choices for game_id={game.get('game_id')} style={style_key}"
-                    )
-                    errors.append(
-                        {
-                            "game_id": game.get("game_id"),
-                            "style": style_key,
-                            "error": "no_choices",
-                        }
-                    )
-                    if pause_seconds > 0:
-                        time.sleep(pause_seconds)
-                    continue
+    if fallback_jobs:
+        log_info(f"Retrying {len(fallback_jobs)} unresolved slots with per-style requests")
+        fallback_jobs = prioritize_jobs(fallback_jobs)
+        total_requests += len(fallback_jobs)
+        for job, result in zip(fallback_jobs, run_phase(fallback_jobs)):
+            result = unwrap_result(job, result)
+            job_results[id(job)] = result
+            failed_requests += int(result["failed"])
+            if result.get("skipped"):
+                skipped_requests += 1
+    total_requests -= skipped_requests
+    log_info(
+        f"LLM jobs finished in {time.monotonic() - started:.1f}s "
+        f"(requests={total_requests} fallback={len(fallback_jobs)})"
+    )
+    log_prompt_budget(llm_jobs + fallback_jobs, max_prompt_tokens)
+    llm_settings["router"].log_stats()
+    if "hedger" in llm_settings:
+        llm_settings["hedger"].log_stats()
+        llm_settings["hedger"].close()
+    log_llm_cache_stats(cache)
+    if cache is not None:
+        cache.close()
 
-                content = choices[0].get("message", {}).get("content", "").strip()
-                normalized = content.upper()
-                if (
-                    not content
-                    or normalized.startswith("INSUFFIC")
-                    or "INSUFFICIENT FACTS" in normalized
-                ):
-                    errors.append(
-                        {
-                            "game_id": game.get("game_id"),
-                            "style": style_key,
-                            "error": "insufficient_facts",
-                        }
-                    )
-                    if pause_seconds > 0:
-                        time.sleep(pause_seconds)
-                    continue
+    if checkpoint is not None:
+        job_results.update(load_checkpoint_results(checkpoint, jobs))
+        checkpoint.close()
+    for job in mix_jobs:
+        job_results[id(job)] = compose_mix_result(job, jobs, job_results, run_id)
+    if skipped_requests:
+        # After mix composition, so mix slots whose sources were all skipped
+        # are counted too.
+        skipped_slots = [
+            job for job in jobs if job_results.get(id(job), {}).get("skipped")
+        ]
+        log_warning(
+            f"Deadline of {deadline_seconds:g}s reached: skipped {skipped_requests} "
+            f"requests covering {len(skipped_slots)} takes "
+            f"({sum(job['recipients'] for job in skipped_slots)} recipient slots)"
+        )
 
-                takes.append(
-                    {
-                        "game_id": game.get("game_id"),
-                        "game_date": game.get("game_date"),
-                        "teams": game.get("teams", []),
-                        "team_aliases": game.get("team_aliases", []),
-                        "focus_team": focus_team,
-                        "style": normalize_style(style_key),
-                        "take_text": content,
-                    }
-                )
+    takes = []
+    fallback_count = 0
+    for job in jobs:
+        result = job_results[id(job)]
+        if fallback_enabled and not result.get("take"):
+            fallback = build_fallback_result(job, result, max_words)
+            if fallback is not None:
+                result = fallback
+                fallback_count += 1
+        if result.get("take"):
+            takes.append(result["take"])
+        if result.get("error"):
+            errors.append(result["error"])
 
-                if pause_seconds > 0:
-                    time.sleep(pause_seconds)
+    if fallback_count:
+        log_warning(f"Filled {fallback_count} takes with template fallbacks")
 
     if total_requests:
         failure_rate = failed_requests / total_requests
@@ -346,18 +1057,42 @@ def main():
         f"Games considered={considered_games} skipped={skipped_games} total={len(games)}"
     )
 
+    model_counts = Counter(take["model"] for take in takes)
     output_payload = {
         "run_id": run_id,
         "run_date": run_date,
         "schema_version": "v1",
         "source": "openrouter",
         "prompt_version": prompt_version,
-        "model": model,
+        "model": ",".join(name for name, _ in model_counts.most_common()) or model,
+        "models": dict(model_counts),
+        "demand": demand_summary,
         "takes": takes,
         "errors": errors,
     }
     write_json(output_path, output_payload)
 
+    telemetry_summary = llm_settings["telemetry"].summarize(len(takes))
+    log_telemetry_summary(telemetry_summary)
+    write_json(
+        telemetry_path,
+        {
+            "run_id": run_id,
+            "run_date": run_date,
+            "summary": telemetry_summary,
+            "calls": llm_settings["telemetry"].calls,
+        },
+    )
+
+    if store is not None:
+        write_takes(store, run_id, takes)
+        if archive_days > 0:
+            cutoff = parse_run_date(run_date) - datetime.timedelta(days=archive_days)
+            pruned = prune_takes(store, cutoff.isoformat())
+            log_info(f"Pruned {pruned} archived takes before {cutoff.isoformat()}")
+        store.close()
+
+    log_http_stats()
     log_end(
         "generate_takes",
         f"takes={len(takes)} errors={len(errors)} output={output_path}",
@@ -14,32 +14,22 @@ from src.pipeline.common import (
     resolve_run_date,
     write_json,
 )
+from src.pipeline.http_utils import log_http_stats
+from src.pipeline.preferences import load_preference_rows
+from src.pipeline.store import open_store_from_env, query_takes, write_deliveries
 from src.pipeline.style_utils import normalize_style, style_label
+from src.pipeline.supabase_utils import open_supabase_reader_from_env
 from src.pipeline.team_utils import matches_team
+from src.pipeline.user_utils import build_user_teams, parse_run_date, should_send_user
 
 
-def fetch_supabase_rows(base_url, api_key, table, query):
-    url = f"{base_url}/rest/v1/{table}?{query}"
-    headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}"}
+def fetch_supabase_rows(supabase, table, query):
     try:
-        response = requests.get(url, headers=headers, timeout=20)
-    except requests.RequestException as exc:
-        log_error(f"Supabase request failed: {exc}")
+        return list(supabase.iter_rows(table, query))
+    except (requests.RequestException, RuntimeError) as exc:
+        log_error(f"Supabase read failed for {table}: {exc}")
         return []
 
-    if response.status_code != 200:
-        log_error(f"Supabase error {response.status_code} for {table}")
-        return []
-
-    return response.json()
-
-
-def parse_run_date(value):
-    try:
-        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
-    except ValueError:
-        return datetime.date.today()
-
 
 def parse_game_date(value):
     if not value:
@@ -50,12 +40,63 @@ def parse_game_date(value):
         return None
 
 
-def should_send_user(user_frequency, run_date, weekly_send_day):
-    frequency = (user_frequency or "daily").strip().lower()
-    if frequency != "weekly":
-        return True
-    day_name = run_date.strftime("%A").lower()
-    return day_name == weekly_send_day
+def is_insufficient_take(take):
+    take_text = (take.get("take_text") or "").strip()
+    return take_text.upper().startswith("INSUFFIC")
+
+
+def take_identity(take):
+    return (
+        str(take.get("game_id")),
+        take.get("focus_team"),
+        normalize_style(take.get("style") or "mix"),
+    )
+
+
+def merge_archived_takes(matching, archived):
+    # Tonight's copy of a take wins over the archived one for the same slot.
+    seen = {take_identity(take) for take in matching}
+    merged = list(matching)
+    for take in archived:
+        identity = take_identity(take)
+        if identity in seen or is_insufficient_take(take):
+            continue
+        seen.add(identity)
+        merged.append(take)
+    return merged
+
+
+def record_delivery_telemetry(
+    telemetry_path, delivery_path, run_id, run_date, deliveries
+):
+    # generate-takes owns the LLM telemetry file; delivery metrics go to their
+    # own file so neither stage rewrites the other's artifact.
+    try:
+        telemetry = load_json(telemetry_path)
+    except (OSError, ValueError):
+        log_info(f"No LLM telemetry at {telemetry_path}; skipping delivery metrics")
+        return
+    calls = telemetry.get("summary", {}).get("calls", 0)
+    delivered = len(deliveries)
+    delivery = {
+        "delivered_emails": delivered,
+        "delivered_takes": sum(len(delivery["takes"]) for delivery in deliveries),
+        "llm_calls": calls,
+        "calls_per_delivered_email": round(calls / delivered, 3) if delivered else None,
+    }
+    write_json(
+        delivery_path,
+        {
+            "run_id": run_id,
+            "run_date": run_date,
+            "llm_run_id": telemetry.get("run_id"),
+            "delivery": delivery,
+        },
+    )
+    log_info(
+        f"LLM calls per delivered email: {delivery['calls_per_delivered_email']} "
+        f"(calls={calls} delivered={delivered} output={delivery_path})"
+    )
 
 
 def main():
@@ -63,6 +104,10 @@ def main():
     run_date = resolve_run_date()
     input_path = get_env("TAKES_PATH", default="/tmp/takes.json")
     output_path = get_env("OUTPUT_PATH", default="/tmp/deliveries.json")
+    telemetry_path = get_env("LLM_TELEMETRY_PATH", default="/tmp/llm_telemetry.json")
+    delivery_telemetry_path = get_env(
+        "DELIVERY_TELEMETRY_PATH", default="/tmp/delivery_telemetry.json"
+    )
 
     supabase_url = get_env("SUPABASE_URL", required=True)
     supabase_key = get_env("SUPABASE_KEY", required=True)
@@ -77,8 +122,12 @@ def main():
         default="select=user_id,team",
     )
 
+    preferences_path = get_env("PREFERENCES_SNAPSHOT_PATH", default="")
+
     max_takes = int(get_env("MAX_TAKES_PER_EMAIL", default="3"))
+    weekly_max_takes = int(get_env("WEEKLY_MAX_TAKES_PER_EMAIL", default=str(max_takes)))
     weekly_send_day = get_env("WEEKLY_SEND_DAY", default="monday").strip().lower()
+    weekly_lookback_days = int(get_env("WEEKLY_LOOKBACK_DAYS", default="7"))
 
     log_start("personalize", run_id, run_date)
 
@@ -97,23 +146,25 @@ def main():
     else:
         log_info("No teams found in takes payload")
 
-    users = fetch_supabase_rows(supabase_url, supabase_key, users_table, users_query)
-    interests = fetch_supabase_rows(
-        supabase_url, supabase_key, interests_table, interests_query
-    )
+    preferences = load_preference_rows(preferences_path) if preferences_path else None
+    if preferences is not None:
+        users, interests = preferences
+    else:
+        supabase = open_supabase_reader_from_env(supabase_url, supabase_key)
+        users = fetch_supabase_rows(supabase, users_table, users_query)
+        interests = fetch_supabase_rows(supabase, interests_table, interests_query)
 
     log_info(f"Loaded {len(users)} users and {len(interests)} interests")
 
-    user_teams = {}
-    for interest in interests:
-        user_id = interest.get("user_id")
-        team = interest.get("team")
-        if not user_id or not team:
-            continue
-        user_teams.setdefault(str(user_id), []).append(team)
+    user_teams = build_user_teams(interests)
 
     deliveries = []
     run_date_obj = parse_run_date(run_date)
+    weekly_since = (
+        run_date_obj - datetime.timedelta(days=weekly_lookback_days)
+    ).isoformat()
+    store = open_store_from_env()
+    archived_used = 0
     totals = {
         "users": 0,
         "skipped_missing_email": 0,
@@ -146,8 +197,7 @@ def main():
         desired_style = normalize_style(user.get("take_style") or "mix")
         matching = []
         for take in takes:
-            take_text = (take.get("take_text") or "").strip()
-            if take_text.upper().startswith("INSUFFIC"):
+            if is_insufficient_take(take):
                 continue
             take_style = normalize_style(take.get("style") or "mix")
             if take_style != desired_style:
@@ -161,6 +211,15 @@ def main():
             if any(matches_team(team, aliases) for team in teams):
                 matching.append(take)
 
+        is_weekly_digest = frequency == "weekly" and store is not None
+        if is_weekly_digest:
+            archived = query_takes(
+                store, team=teams, style=desired_style, date_from=weekly_since
+            )
+            tonight = len(matching)
+            matching = merge_archived_takes(matching, archived)
+            archived_used += len(matching) - tonight
+
         if not matching:
             log_info(
                 f"Skipping user_id={user_id} no matching takes "
@@ -174,7 +233,11 @@ def main():
             or datetime.datetime.min,
             reverse=True,
         )
-        selected = matching[:max_takes]
+        if is_weekly_digest:
+            # A week has more candidates than slots; prefer model-written
+            # takes over template fallbacks before recency.
+            matching.sort(key=lambda take: bool(take.get("fallback")))
+        selected = matching[: weekly_max_takes if is_weekly_digest else max_takes]
 
         subject = f"{frequency.title()} NBA Takes - {run_date}"
         unsubscribe_url = user.get("unsubscribe_url")
@@ -202,6 +265,19 @@ def main():
     }
     write_json(output_path, output_payload)
 
+    if store is not None:
+        log_info(
+            f"Weekly digests drew {archived_used} takes from the archive "
+            f"since {weekly_since}"
+        )
+        write_deliveries(store, run_id, deliveries)
+        store.close()
+
+    record_delivery_telemetry(
+        telemetry_path, delivery_telemetry_path, run_id, run_date, deliveries
+    )
+
+    log_http_stats()
     log_end(
         "personalize",
         f"deliveries={len(deliveries)} output={output_path}",
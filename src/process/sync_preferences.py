@@ -0,0 +1,68 @@
+from src.pipeline.common import (
+    build_run_id,
+    get_env,
+    log_end,
+    log_info,
+    log_start,
+    resolve_run_date,
+)
+from src.pipeline.http_utils import log_http_stats
+from src.pipeline.preferences import load_snapshot, sync_snapshot, write_snapshot
+from src.pipeline.supabase_utils import open_supabase_reader_from_env
+
+
+def main():
+    run_id = build_run_id()
+    run_date = resolve_run_date()
+    snapshot_path = get_env(
+        "PREFERENCES_SNAPSHOT_PATH", default=".cache/preferences/snapshot.json"
+    )
+    supabase_url = get_env("SUPABASE_URL", required=True).rstrip("/")
+    supabase_key = get_env("SUPABASE_KEY", required=True)
+    users_table = get_env("SUPABASE_USERS_TABLE", default="users")
+    interests_table = get_env("SUPABASE_INTERESTS_TABLE", default="interests")
+    users_query = get_env(
+        "SUPABASE_USERS_QUERY", default="select=id,email,frequency,take_style"
+    )
+    interests_query = get_env(
+        "SUPABASE_INTERESTS_QUERY", default="select=user_id,team"
+    )
+    full_refresh_days = float(get_env("PREFERENCES_FULL_REFRESH_DAYS", default="7"))
+    overlap_seconds = float(get_env("PREFERENCES_SYNC_OVERLAP_SECONDS", default="300"))
+    sweep_hours = float(get_env("PREFERENCES_DELETION_SWEEP_HOURS", default="0"))
+
+    log_start("sync_preferences", run_id, run_date)
+
+    snapshot = load_snapshot(snapshot_path)
+    if snapshot is not None:
+        log_info(
+            f"Previous snapshot: users={len(snapshot['users'])} "
+            f"cursor={snapshot.get('cursor')} synced_at={snapshot.get('synced_at')}"
+        )
+    snapshot, stats = sync_snapshot(
+        open_supabase_reader_from_env(supabase_url, supabase_key),
+        snapshot,
+        users_table=users_table,
+        users_query=users_query,
+        interests_table=interests_table,
+        interests_query=interests_query,
+        full_refresh_seconds=full_refresh_days * 86400,
+        overlap_seconds=overlap_seconds,
+        deletion_sweep_seconds=sweep_hours * 3600,
+    )
+    write_snapshot(snapshot_path, snapshot)
+
+    log_http_stats()
+    log_end(
+        "sync_preferences",
+        f"mode={stats['mode']} users={stats['users']} "
+        f"changed_users={stats['changed_users']} "
+        f"deletion_sweep={stats['deletion_sweep']} "
+        f"removed_users={stats['removed_users']} pages={stats['pages']} "
+        f"teams={len(snapshot['teams'])} cursor={snapshot['cursor']} "
+        f"output={snapshot_path}",
+    )
+
+
+if __name__ == "__main__":
+    main()